@@ -1,64 +1,81 @@
-from fastapi import APIRouter, HTTPException
-
-from app.models.schemas import (
-    ComparisonOverlapRequest,
-    ComparisonTokenizeRequest,
-    ComparisonTokenizeResponse,
-    EfficiencyMetric,
-    EfficiencyRequest,
-    EfficiencyResponse,
-    OverlapResult,
-    TokenizerTokenization,
-    TokenInfo,
-)
+import orjson
+from fastapi import APIRouter, HTTPException, Request, Response
+
 from app.services.comparison import compare_tokenization, compute_efficiency, compute_overlap
 from app.services.registry import registry
 
 router = APIRouter(prefix="/api/comparison", tags=["comparison"])
 
 
+async def _decode_body(request: Request) -> dict:
+    """Decode the request body with orjson instead of the pydantic machinery.
+
+    These DTOs are tiny (a couple of strings and a list), so a direct decode
+    plus explicit checks is much cheaper than per-field validator dispatch.
+    """
+    try:
+        body = orjson.loads(await request.body())
+    except orjson.JSONDecodeError:
+        raise HTTPException(status_code=422, detail="Invalid JSON body")
+    if not isinstance(body, dict):
+        raise HTTPException(status_code=422, detail="Request body must be a JSON object")
+    ids = body.get("tokenizer_ids")
+    if (
+        not isinstance(ids, list)
+        or len(ids) < 2
+        or not all(isinstance(i, str) for i in ids)
+    ):
+        raise HTTPException(
+            status_code=422, detail="tokenizer_ids must be a list of at least 2 strings"
+        )
+    return body
+
+
 def _get_adapters(tokenizer_ids: list[str]):
-    adapters = {}
-    for tok_id in tokenizer_ids:
-        adapter = registry.get(tok_id)
-        if adapter is None:
-            raise HTTPException(
-                status_code=404, detail=f"Tokenizer '{tok_id}' not loaded"
-            )
-        adapters[tok_id] = adapter
-    return adapters
-
-
-@router.post("/overlap", response_model=OverlapResult)
-async def get_overlap(req: ComparisonOverlapRequest):
-    adapters = _get_adapters(req.tokenizer_ids)
-    result = compute_overlap(adapters)
-    return OverlapResult(**result)
-
-
-@router.post("/tokenize", response_model=ComparisonTokenizeResponse)
-async def compare_tokenize(req: ComparisonTokenizeRequest):
-    adapters = _get_adapters(req.tokenizer_ids)
-    results = compare_tokenization(adapters, req.text)
-    print(results)
-    print(adapters)
-    return ComparisonTokenizeResponse(
-        results=[
-            TokenizerTokenization(
-                tokenizer_id=r["tokenizer_id"],
-                tokens=[TokenInfo(**t) for t in r["tokens"]],
-                token_count=r["token_count"],
-            )
-            for r in results
-        ],
-        text=req.text,
-    )
-
-
-@router.post("/efficiency", response_model=EfficiencyResponse)
-async def compare_efficiency(req: EfficiencyRequest):
-    adapters = _get_adapters(req.tokenizer_ids)
-    results = compute_efficiency(adapters, req.sample_texts)
-    return EfficiencyResponse(
-        metrics=[EfficiencyMetric(**r) for r in results]
-    )
+    try:
+        return registry.get_many(tokenizer_ids)
+    except KeyError as e:
+        raise HTTPException(
+            status_code=404, detail=f"Tokenizer '{e.args[0]}' not loaded"
+        )
+
+
+def _json(payload: dict) -> Response:
+    """Serialize trusted service output straight to orjson bytes.
+
+    The service layer already emits schema-shaped dicts, so wrapping every
+    token in a pydantic model is N constructor calls for no validation gain.
+    """
+    return Response(content=orjson.dumps(payload), media_type="application/json")
+
+
+@router.post("/overlap")
+async def get_overlap(request: Request):
+    body = await _decode_body(request)
+    adapters = _get_adapters(body["tokenizer_ids"])
+    return _json(await compute_overlap(adapters))
+
+
+@router.post("/tokenize")
+async def compare_tokenize(request: Request):
+    body = await _decode_body(request)
+    text = body.get("text")
+    if not isinstance(text, str):
+        raise HTTPException(status_code=422, detail="text must be a string")
+    adapters = _get_adapters(body["tokenizer_ids"])
+    results = compare_tokenization(adapters, text)
+    return _json({"results": results, "text": text})
+
+
+@router.post("/efficiency")
+async def compare_efficiency(request: Request):
+    body = await _decode_body(request)
+    sample_texts = body.get("sample_texts")
+    if sample_texts is not None and (
+        not isinstance(sample_texts, list)
+        or not all(isinstance(t, str) for t in sample_texts)
+    ):
+        raise HTTPException(status_code=422, detail="sample_texts must be a list of strings")
+    adapters = _get_adapters(body["tokenizer_ids"])
+    results = await compute_efficiency(adapters, sample_texts)
+    return _json({"metrics": results})
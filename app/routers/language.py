@@ -1,25 +1,43 @@
-from fastapi import APIRouter, HTTPException
+import asyncio
+from collections import defaultdict
 
-from app.models.schemas import LanguageCompositionResponse, ScriptCategory
+import orjson
+from fastapi import APIRouter, HTTPException, Response
+
+from app.services.cache import LRUCache
 from app.services.language import compute_language_composition
 from app.services.registry import registry
 
 router = APIRouter(prefix="/api/language", tags=["language"])
 
-_language_cache: dict[str, dict] = {}
+# Pre-serialized response bytes per tokenizer
+_language_cache = LRUCache(maxsize=8)
+# Per-tokenizer locks so concurrent cold hits compute only once
+_locks: defaultdict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+
+def _evict(tok_id: str) -> None:
+    _language_cache.pop(tok_id)
+    _locks.pop(tok_id, None)
+
+
+registry.on_unload(_evict)
 
 
-@router.get("/{tok_id:path}", response_model=LanguageCompositionResponse)
+@router.get("/{tok_id:path}")
 async def get_language_composition(tok_id: str):
-    if tok_id not in _language_cache:
+    cached = _language_cache.get(tok_id)
+    if cached is None:
+        # Resolve the adapter before touching _locks so unknown ids 404
+        # without leaving a lock entry behind
         adapter = registry.get(tok_id)
         if adapter is None:
-            raise HTTPException(status_code=404, detail=f"Tokenizer '{tok_id}' not loaded")
-        _language_cache[tok_id] = compute_language_composition(adapter)
-
-    data = _language_cache[tok_id]
-    return LanguageCompositionResponse(
-        categories=[ScriptCategory(**c) for c in data["categories"]],
-        total_tokens=data["total_tokens"],
-        mixed_script_count=data["mixed_script_count"],
-    )
+            raise HTTPException(
+                status_code=404, detail=f"Tokenizer '{tok_id}' not loaded"
+            )
+        async with _locks[tok_id]:
+            cached = _language_cache.get(tok_id)
+            if cached is None:
+                # Full-vocab scan: run off the event loop
+                data = await asyncio.to_thread(compute_language_composition, adapter)
+                cached = _language_cache[tok_id] = orjson.dumps(data)
+    return Response(content=cached, media_type="application/json")
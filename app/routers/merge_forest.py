@@ -1,36 +1,21 @@
+import numpy as np
+import orjson
 from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
 
 from app.models.schemas import (
-    MergeForestEntry,
     MergeForestResponse,
     MergeForestSubtreeNode,
     MergeForestSubtreeResponse,
     MergeForestTreeInfo,
     MergeForestTreesResponse,
 )
-from app.services.merge_forest import get_cached_entries, get_subtree, tree_depth, tree_node_count
+from app.services.merge_forest import evict_cached_index, get_cached_index
 from app.services.registry import registry
 
 router = APIRouter(prefix="/api/merge-forest", tags=["merge-forest"])
 
-
-def _entry_to_schema(e) -> MergeForestEntry:
-    left_str = e.left_bytes.decode("utf-8", errors="replace") if e.left_bytes else None
-    right_str = e.right_bytes.decode("utf-8", errors="replace") if e.right_bytes else None
-    return MergeForestEntry(
-        token=e.token_str(),
-        token_hex=e.token_hex(),
-        rank=e.rank,
-        byte_length=len(e.token_bytes),
-        is_leaf=e.is_leaf,
-        is_root=e.is_root,
-        left=left_str,
-        left_hex=e.left_bytes.hex() if e.left_bytes else None,
-        left_rank=e.left_rank if e.left_bytes else None,
-        right=right_str,
-        right_hex=e.right_bytes.hex() if e.right_bytes else None,
-        right_rank=e.right_rank if e.right_bytes else None,
-    )
+registry.on_unload(evict_cached_index)
 
 
 def _get_adapter_and_ranks(tok_id: str):
@@ -44,23 +29,52 @@ def _get_adapter_and_ranks(tok_id: str):
 
 
 def _count_tree(node: dict) -> tuple[int, int]:
-    """Return (depth, node_count) of a subtree dict."""
-    if node.get("is_leaf"):
-        return 1, 1
-    ld, lc = _count_tree(node["left"])
-    rd, rc = _count_tree(node["right"])
-    return 1 + max(ld, rd), 1 + lc + rc
+    """Return (depth, node_count) of a subtree dict.
+
+    Iterative post-order walk: deep BPE trees would otherwise pay a Python
+    frame per node and can exceed the recursion limit.
+    """
+    results: dict[int, tuple[int, int]] = {}
+    stack: list[tuple[dict, bool]] = [(node, False)]
+    while stack:
+        n, visited = stack.pop()
+        if n.get("is_leaf"):
+            results[id(n)] = (1, 1)
+        elif not visited:
+            stack.append((n, True))
+            stack.append((n["left"], False))
+            stack.append((n["right"], False))
+        else:
+            ld, lc = results[id(n["left"])]
+            rd, rc = results[id(n["right"])]
+            results[id(n)] = (1 + max(ld, rd), 1 + lc + rc)
+    return results[id(node)]
 
 
 def _dict_to_schema(d: dict) -> MergeForestSubtreeNode:
-    return MergeForestSubtreeNode(
-        token=d["token"],
-        token_hex=d["token_hex"],
-        rank=d["rank"],
-        is_leaf=d["is_leaf"],
-        left=_dict_to_schema(d["left"]) if d.get("left") else None,
-        right=_dict_to_schema(d["right"]) if d.get("right") else None,
-    )
+    """Build the schema tree bottom-up with an explicit stack."""
+    built: dict[int, MergeForestSubtreeNode] = {}
+    stack: list[tuple[dict, bool]] = [(d, False)]
+    while stack:
+        n, visited = stack.pop()
+        left = n.get("left")
+        right = n.get("right")
+        if not visited and (left or right):
+            stack.append((n, True))
+            if left:
+                stack.append((left, False))
+            if right:
+                stack.append((right, False))
+            continue
+        built[id(n)] = MergeForestSubtreeNode(
+            token=n["token"],
+            token_hex=n["token_hex"],
+            rank=n["rank"],
+            is_leaf=n["is_leaf"],
+            left=built[id(left)] if left else None,
+            right=built[id(right)] if right else None,
+        )
+    return built[id(d)]
 
 
 # Subtree endpoint MUST be defined before the catch-all {tok_id:path} route
@@ -70,18 +84,14 @@ async def get_merge_forest_subtree(
     tok_id: str = Query(..., description="Tokenizer ID"),
 ):
     _, ranks = _get_adapter_and_ranks(tok_id)
+    index = get_cached_index(tok_id, ranks)
 
-    # Find the token with the given rank
-    target_bytes: bytes | None = None
-    for token_bytes, r in ranks.items():
-        if r == rank:
-            target_bytes = token_bytes
-            break
-
-    if target_bytes is None:
+    # Find the token with the given rank via the precomputed reverse index
+    target_idx = index.rank_to_index.get(rank)
+    if target_idx is None:
         raise HTTPException(404, f"No token found with rank {rank}")
 
-    tree = get_subtree(ranks, target_bytes)
+    tree = index.subtree(target_idx)
     depth, node_count = _count_tree(tree)
 
     return MergeForestSubtreeResponse(
@@ -102,63 +112,48 @@ async def get_merge_forest_trees(
 ):
     """Return paginated root trees (connected components) with full subtrees."""
     _, ranks = _get_adapter_and_ranks(tok_id)
-    entries = get_cached_entries(tok_id, ranks)
+    index = get_cached_index(tok_id, ranks)
 
-    # Only root non-leaf entries are connected component roots
-    roots = [e for e in entries if e.is_root and not e.is_leaf]
+    # Precomputed permutation over root merge entries; no per-request sort
+    order = index.root_orders()[(sort_by, sort_dir)]
+    total_roots_count = len(order)
 
     # Search across the full tree (match root token string)
     if search:
         search_lower = search.lower()
-        roots = [
-            e for e in roots
-            if search_lower in e.token_str().lower() or search_lower in e.token_hex()
+        lower_strs = index.lower_strs
+        hex_strs = index.hex_strs
+        matches = [
+            i for i in order.tolist()
+            if search_lower in lower_strs[i] or search_lower in hex_strs[i]
         ]
-
-    # Compute depth for sorting (cached per call)
-    depth_cache: dict[bytes, int] = {}
-
-    def get_depth(e) -> int:
-        if e.token_bytes not in depth_cache:
-            depth_cache[e.token_bytes] = tree_depth(ranks, e.token_bytes)
-        return depth_cache[e.token_bytes]
-
-    # Sort
-    reverse = sort_dir == "desc"
-    if sort_by == "rank":
-        roots.sort(key=lambda e: e.rank, reverse=reverse)
-    elif sort_by == "byte_length":
-        roots.sort(key=lambda e: len(e.token_bytes), reverse=reverse)
-    elif sort_by == "depth":
-        roots.sort(key=lambda e: get_depth(e), reverse=reverse)
-
-    total = len(roots)
-    start = (page - 1) * page_size
-    page_roots = roots[start : start + page_size]
+        total = len(matches)
+        start = (page - 1) * page_size
+        page_indices = matches[start : start + page_size]
+    else:
+        total = total_roots_count
+        start = (page - 1) * page_size
+        page_indices = order[start : start + page_size].tolist()
 
     # Build full subtrees for each root on this page
     tree_infos: list[MergeForestTreeInfo] = []
-    for e in page_roots:
-        subtree_dict = get_subtree(ranks, e.token_bytes)
+    for i in page_indices:
+        subtree_dict = index.subtree(i)
         depth, node_count = _count_tree(subtree_dict)
         tree_infos.append(MergeForestTreeInfo(
             root=_dict_to_schema(subtree_dict),
             depth=depth,
             node_count=node_count,
-            byte_length=len(e.token_bytes),
+            byte_length=int(index.byte_lens[i]),
         ))
 
-    total_leaves = sum(1 for e in entries if e.is_leaf)
-    total_merges = sum(1 for e in entries if not e.is_leaf)
-    total_roots_count = sum(1 for e in entries if e.is_root and not e.is_leaf)
-
     return MergeForestTreesResponse(
         trees=tree_infos,
         total=total,
         page=page,
         page_size=page_size,
-        total_leaves=total_leaves,
-        total_merges=total_merges,
+        total_leaves=index.total_leaves,
+        total_merges=index.total_merges,
         total_roots=total_roots_count,
     )
 
@@ -174,49 +169,54 @@ async def get_merge_forest(
     filter: str = Query("all", pattern="^(all|leaves|merges|roots)$"),
 ):
     _, ranks = _get_adapter_and_ranks(tok_id)
-    entries = get_cached_entries(tok_id, ranks)
+    index = get_cached_index(tok_id, ranks)
 
-    # Filter
+    # Precomputed sort permutation, then narrow by filter mask
+    order = index.sort_orders[(sort_by, sort_dir)]
     if filter == "leaves":
-        filtered = [e for e in entries if e.is_leaf]
+        order = order[index.leaf_mask[order]]
     elif filter == "merges":
-        filtered = [e for e in entries if not e.is_leaf]
+        order = order[index.merge_mask[order]]
     elif filter == "roots":
-        filtered = [e for e in entries if e.is_root]
-    else:
-        filtered = entries
+        order = order[index.root_mask[order]]
 
-    # Search
+    start = (page - 1) * page_size
     if search:
         search_lower = search.lower()
-        filtered = [
-            e for e in filtered
-            if search_lower in e.token_str().lower() or search_lower in e.token_hex()
+        lower_strs = index.lower_strs
+        hex_strs = index.hex_strs
+        candidates = index.search_candidates(search_lower)
+        if candidates is not None:
+            mask = np.zeros(len(lower_strs), dtype=bool)
+            mask[candidates] = True
+            order = order[mask[order]]
+        matches = [
+            i for i in order.tolist()
+            if search_lower in lower_strs[i] or search_lower in hex_strs[i]
         ]
+        total = len(matches)
+        page_indices = matches[start : start + page_size]
+    else:
+        total = len(order)
+        page_indices = order[start : start + page_size].tolist()
+
+    meta = orjson.dumps(
+        {
+            "total": total,
+            "page": page,
+            "page_size": page_size,
+            "total_leaves": index.total_leaves,
+            "total_merges": index.total_merges,
+            "total_roots": index.total_roots,
+        }
+    )
 
-    # Sort
-    reverse = sort_dir == "desc"
-    if sort_by == "rank":
-        filtered.sort(key=lambda e: e.rank, reverse=reverse)
-    elif sort_by == "byte_length":
-        filtered.sort(key=lambda e: len(e.token_bytes), reverse=reverse)
-    elif sort_by == "token":
-        filtered.sort(key=lambda e: e.token_str(), reverse=reverse)
-
-    total = len(filtered)
-    start = (page - 1) * page_size
-    page_entries = filtered[start : start + page_size]
-
-    total_leaves = sum(1 for e in entries if e.is_leaf)
-    total_merges = sum(1 for e in entries if not e.is_leaf)
-    total_roots = sum(1 for e in entries if e.is_root)
+    def stream():
+        # Emit entries one by one so no intermediate model list is built
+        yield b'{"entries":['
+        for pos, i in enumerate(page_indices):
+            chunk = orjson.dumps(index.entry_dict(i))
+            yield chunk if pos == 0 else b"," + chunk
+        yield b"]," + meta[1:]  # splice in the metadata object's fields
 
-    return MergeForestResponse(
-        entries=[_entry_to_schema(e) for e in page_entries],
-        total=total,
-        page=page,
-        page_size=page_size,
-        total_leaves=total_leaves,
-        total_merges=total_merges,
-        total_roots=total_roots,
-    )
+    return StreamingResponse(stream(), media_type="application/json")
@@ -1,50 +1,69 @@
-from fastapi import APIRouter, HTTPException, Query
+import orjson
+from fastapi import APIRouter, HTTPException, Query, Response
 
-from app.models.schemas import MorphemeAnalysisResponse, MorphemeBreakdown
-from app.services.morphemes import compute_morpheme_analysis
+from app.services import precompute
+from app.services.cache import LRUCache
 from app.services.registry import registry
 
 router = APIRouter(prefix="/api/morphemes", tags=["morphemes"])
 
-_morpheme_cache: dict[str, list[dict]] = {}
+# tok_id -> column-oriented analysis of the full vocabulary
+_morpheme_cache = LRUCache(maxsize=8)
+# Pre-serialized page payloads keyed by (tok_id, page, page_size, type_filter)
+_page_cache = LRUCache(maxsize=1024)
 
 
-@router.get("/{tok_id:path}", response_model=MorphemeAnalysisResponse)
+def _evict(tok_id: str) -> None:
+    _morpheme_cache.pop(tok_id)
+    _page_cache.evict_matching(lambda key: key[0] == tok_id)
+
+
+registry.on_unload(_evict)
+
+
+@router.get("/{tok_id:path}")
 async def get_morphemes(
     tok_id: str,
     page: int = Query(1, ge=1),
     page_size: int = Query(100, ge=1, le=1000),
     type_filter: str = Query(""),
 ):
+    key = (tok_id, page, page_size, type_filter)
+    cached = _page_cache.get(key)
+    if cached is not None:
+        return Response(content=cached, media_type="application/json")
+
     if tok_id not in _morpheme_cache:
         adapter = registry.get(tok_id)
         if adapter is None:
-            raise HTTPException(status_code=404, detail=f"Tokenizer '{tok_id}' not loaded")
-        _morpheme_cache[tok_id] = compute_morpheme_analysis(adapter)
+            raise HTTPException(
+                status_code=404, detail=f"Tokenizer '{tok_id}' not loaded"
+            )
+        # Usually already built by the registry's background precompute;
+        # a cold hit submits the scan and concurrent hits share the future
+        _morpheme_cache[tok_id] = await precompute.result(tok_id, adapter, "morphemes")
 
-    all_results = _morpheme_cache[tok_id]
-
-    # Compute type distribution from full results
-    type_dist: dict[str, int] = {}
-    for r in all_results:
-        t = r["morpheme_type"]
-        type_dist[t] = type_dist.get(t, 0) + 1
+    table = _morpheme_cache[tok_id]
+    start = (page - 1) * page_size
+    end = start + page_size
 
-    # Apply filter
+    # Filter is a C-level compare on the type-code column; only the
+    # current page is materialized as dicts.
     if type_filter:
-        filtered = [r for r in all_results if r["morpheme_type"] == type_filter]
+        indices = table.indices_for_type(type_filter)
+        total = len(indices)
+        page_results = table.rows(indices[start:end])
     else:
-        filtered = all_results
+        total = len(table)
+        page_results = table.rows(range(start, min(end, total)))
 
-    total = len(filtered)
-    start = (page - 1) * page_size
-    end = start + page_size
-    page_results = filtered[start:end]
-
-    return MorphemeAnalysisResponse(
-        breakdowns=[MorphemeBreakdown(**r) for r in page_results],
-        total=total,
-        page=page,
-        page_size=page_size,
-        type_distribution=type_dist,
+    cached = _page_cache[key] = orjson.dumps(
+        {
+            "breakdowns": page_results,
+            "total": total,
+            "page": page,
+            "page_size": page_size,
+            "type_distribution": table.type_dist,
+        }
     )
+    return Response(content=cached, media_type="application/json")
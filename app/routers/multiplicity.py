@@ -1,73 +1,86 @@
-from fastapi import APIRouter, HTTPException, Query
+import orjson
+from fastapi import APIRouter, HTTPException, Query, Response
 
 from app.models.schemas import MultiplicityGroup, MultiplicityResponse, VariantInfo
-from app.services.multiplicity import compute_multiplicity_groups, search_multiplicity_groups
+from app.services import precompute
+from app.services.multiplicity import MultiplicityTable, search_multiplicity_groups
+from app.services.cache import LRUCache
 from app.services.registry import registry
 
 router = APIRouter(prefix="/api/multiplicity", tags=["multiplicity"])
 
-# Cache multiplicity results per tokenizer
-_multiplicity_cache: dict[str, list[dict]] = {}
+# Cache the column-oriented group table per tokenizer
+_multiplicity_cache = LRUCache(maxsize=8)
+# Pre-serialized page payloads keyed by (tok_id, page, page_size)
+_page_cache = LRUCache(maxsize=1024)
 
 
-def _get_groups(tok_id: str) -> list[dict]:
+def _evict(tok_id: str) -> None:
+    _multiplicity_cache.pop(tok_id)
+    _page_cache.evict_matching(lambda key: key[0] == tok_id)
+
+
+registry.on_unload(_evict)
+
+
+async def _get_table(tok_id: str) -> MultiplicityTable:
     if tok_id not in _multiplicity_cache:
         adapter = registry.get(tok_id)
         if adapter is None:
             raise HTTPException(status_code=404, detail=f"Tokenizer '{tok_id}' not loaded")
-        _multiplicity_cache[tok_id] = compute_multiplicity_groups(adapter)
+        # Usually already built by the registry's background precompute
+        _multiplicity_cache[tok_id] = await precompute.result(
+            tok_id, adapter, "multiplicity"
+        )
     return _multiplicity_cache[tok_id]
 
 
-
 @router.get("/search/{tok_id:path}", response_model=MultiplicityResponse)
 async def search_multiplicity(
     tok_id: str,
     query: str = Query("", min_length=1),
 ):
-    adapter = registry.get(tok_id)
-    if adapter is None:
-        raise HTTPException(status_code=404, detail=f"Tokenizer '{tok_id}' not loaded")
-
-    results = search_multiplicity_groups(adapter, query)
+    table = await _get_table(tok_id)
+    indices = search_multiplicity_groups(table, query)
 
     return MultiplicityResponse(
         groups=[
-            MultiplicityGroup(
+            MultiplicityGroup.model_construct(
                 base_form=g["base_form"],
-                variants=[VariantInfo(**v) for v in g["variants"]],
+                variants=[VariantInfo.model_construct(**v) for v in g["variants"]],
                 count=g["count"],
             )
-            for g in results[:100]  # Cap at 100 results
+            for g in table.groups(indices[:100])  # Cap at 100 results
         ],
-        total_groups=len(results),
+        total_groups=len(indices),
         page=1,
-        page_size=len(results),
+        page_size=len(indices),
     )
 
 # put general route second
-@router.get("/{tok_id:path}", response_model=MultiplicityResponse)
+@router.get("/{tok_id:path}")
 async def get_multiplicity(
     tok_id: str,
     page: int = Query(1, ge=1),
     page_size: int = Query(50, ge=1, le=200),
 ):
-    groups = _get_groups(tok_id)
-    total = len(groups)
+    key = (tok_id, page, page_size)
+    cached = _page_cache.get(key)
+    if cached is not None:
+        return Response(content=cached, media_type="application/json")
+
+    table = await _get_table(tok_id)
+    total = len(table)
     start = (page - 1) * page_size
     end = start + page_size
-    page_groups = groups[start:end]
+    page_groups = table.groups(range(start, min(end, total)))
 
-    return MultiplicityResponse(
-        groups=[
-            MultiplicityGroup(
-                base_form=g["base_form"],
-                variants=[VariantInfo(**v) for v in g["variants"]],
-                count=g["count"],
-            )
-            for g in page_groups
-        ],
-        total_groups=total,
-        page=page,
-        page_size=page_size,
+    cached = _page_cache[key] = orjson.dumps(
+        {
+            "groups": page_groups,
+            "total_groups": total,
+            "page": page,
+            "page_size": page_size,
+        }
     )
+    return Response(content=cached, media_type="application/json")
@@ -1,5 +1,6 @@
-import json
+import codecs
 
+import orjson
 from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect
 
 from app.models.schemas import TokenInfo, TokenizeRequest, TokenizeResponse
@@ -8,33 +9,55 @@ from app.services.registry import registry
 router = APIRouter(prefix="/api/tokenize", tags=["tokenize"])
 
 
-def _build_tokens(adapter, text: str) -> list[TokenInfo]:
+def _token_strings(adapter, token_ids: list[int]):
+    """Yield (token_id, token_str, token_bytes) for each token.
+
+    Byte-exact adapters stream per-token bytes through one incremental
+    UTF-8 decoder, so multi-byte characters split across tokens come out
+    right without re-decoding the whole prefix per token. Backends whose
+    surface forms aren't raw bytes (e.g. WordPiece "##" markers) diff
+    decoded prefixes instead, which is quadratic but preserves the exact
+    decode semantics.
+    """
+    if adapter.byte_exact_decode:
+        decoder = codecs.getincrementaldecoder("utf-8")("replace")
+        last = len(token_ids) - 1
+        for i, tid in enumerate(token_ids):
+            token_bytes = adapter.decode_token_bytes(tid)
+            # final on the last token flushes a trailing incomplete
+            # sequence as U+FFFD instead of dropping it
+            yield tid, decoder.decode(token_bytes, i == last), token_bytes
+    else:
+        prev_decoded = ""
+        for i, tid in enumerate(token_ids):
+            curr_decoded = adapter.decode(token_ids[: i + 1])
+            token_str = curr_decoded[len(prev_decoded):]
+            prev_decoded = curr_decoded
+            yield tid, token_str, token_str.encode("utf-8", errors="replace")
+
+
+def _build_token_dicts(adapter, text: str) -> list[dict]:
     token_ids = adapter.encode(text)
-    tokens: list[TokenInfo] = []
+    tokens: list[dict] = []
     offset = 0
-    prev_decoded = ""
-    for i, tid in enumerate(token_ids):
-        # Use incremental decoding to preserve context (e.g. SentencePiece ▁ → space).
-        # Decode prefix token_ids[:i+1] and diff against previous prefix.
-        curr_decoded = adapter.decode(token_ids[: i + 1])
-        token_str = curr_decoded[len(prev_decoded):]
-        prev_decoded = curr_decoded
-
-        token_bytes = token_str.encode("utf-8", errors="replace")
-        start = text.find(token_str, offset)
-        if start == -1:
+    for tid, token_str, token_bytes in _token_strings(adapter, token_ids):
+        if text.startswith(token_str, offset):
             start = offset
+        else:
+            start = text.find(token_str, offset)
+            if start == -1:
+                start = offset
         end = start + len(token_str)
         offset = end
         tokens.append(
-            TokenInfo(
-                id=tid,
-                token_str=token_str,
-                token_bytes_hex=token_bytes.hex(),
-                byte_length=len(token_bytes),
-                start=start,
-                end=end,
-            )
+            {
+                "id": tid,
+                "token_str": token_str,
+                "token_bytes_hex": token_bytes.hex(),
+                "byte_length": len(token_bytes),
+                "start": start,
+                "end": end,
+            }
         )
     return tokens
 
@@ -46,9 +69,9 @@ async def tokenize_text(req: TokenizeRequest):
     if adapter is None:
         raise HTTPException(status_code=404, detail=f"Tokenizer '{req.tokenizer_id}' not loaded")
 
-    tokens = _build_tokens(adapter, req.text)
-    return TokenizeResponse(
-        tokens=tokens,
+    tokens = _build_token_dicts(adapter, req.text)
+    return TokenizeResponse.model_construct(
+        tokens=[TokenInfo.model_construct(**t) for t in tokens],
         token_count=len(tokens),
         char_count=len(req.text),
     )
@@ -62,7 +85,7 @@ async def tokenize_ws(websocket: WebSocket):
         while True:
             data = await websocket.receive_text()
             try:
-                msg = json.loads(data)
+                msg = orjson.loads(data)
                 tokenizer_id = msg.get("tokenizer_id", "")
                 text = msg.get("text", "")
 
@@ -73,14 +96,20 @@ async def tokenize_ws(websocket: WebSocket):
                     )
                     continue
 
-                tokens = _build_tokens(adapter, text)
-                response = TokenizeResponse(
-                    tokens=tokens,
-                    token_count=len(tokens),
-                    char_count=len(text),
+                # Plain dicts straight to orjson: no pydantic frames on the
+                # per-keystroke path. Decoded to keep sending text frames —
+                # clients parse event.data without handling binary frames
+                tokens = _build_token_dicts(adapter, text)
+                await websocket.send_text(
+                    orjson.dumps(
+                        {
+                            "tokens": tokens,
+                            "token_count": len(tokens),
+                            "char_count": len(text),
+                        }
+                    ).decode()
                 )
-                await websocket.send_json(response.model_dump())
-            except json.JSONDecodeError:
+            except orjson.JSONDecodeError:
                 await websocket.send_json({"error": "Invalid JSON"})
             except Exception as e:
                 await websocket.send_json({"error": str(e)})
@@ -1,27 +1,36 @@
-from fastapi import APIRouter, HTTPException
+import orjson
+from fastapi import APIRouter, HTTPException, Response
 
 from app.models.schemas import (
     LoadTokenizerRequest,
     LoadTokenizerResponse,
     TokenizerInfo,
-    TokenizerListResponse,
 )
 from app.services.registry import registry
 
 router = APIRouter(prefix="/api/tokenizers", tags=["tokenizers"])
 
+# (registry.list_version, serialized response) — the SPA polls this
+# endpoint, so serve pre-serialized bytes until the loaded set changes
+_list_cache: tuple[int, bytes] | None = None
 
-@router.get("", response_model=TokenizerListResponse)
+
+@router.get("")
 async def list_tokenizers():
     """List available and loaded tokenizers."""
+    global _list_cache
+    version = registry.list_version
+    if _list_cache is not None and _list_cache[0] == version:
+        return Response(content=_list_cache[1], media_type="application/json")
+
     loaded = registry.list_loaded()
     available = registry.list_available()
     # Merge: loaded first, then available that aren't loaded
     loaded_ids = {t["id"] for t in loaded}
     all_tokenizers = loaded + [t for t in available if t["id"] not in loaded_ids]
-    return TokenizerListResponse(
-        tokenizers=[TokenizerInfo(**t) for t in all_tokenizers]
-    )
+    payload = orjson.dumps({"tokenizers": all_tokenizers})
+    _list_cache = (version, payload)
+    return Response(content=payload, media_type="application/json")
 
 
 @router.post("/{name:path}/reload", response_model=LoadTokenizerResponse)
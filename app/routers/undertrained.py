@@ -1,20 +1,36 @@
-from fastapi import APIRouter, HTTPException, Query
+import orjson
+from fastapi import APIRouter, HTTPException, Query, Response
 
-from app.models.schemas import UndertrainedResponse, UndertrainedToken
+from app.services import precompute
+from app.services.cache import LRUCache
 from app.services.registry import registry
-from app.services.undertrained import detect_undertrained_tokens
 
 router = APIRouter(prefix="/api/undertrained", tags=["undertrained"])
 
-_undertrained_cache: dict[str, list[dict]] = {}
+_undertrained_cache = LRUCache(maxsize=8)
+# Pre-serialized page payloads keyed by (tok_id, page, page_size)
+_page_cache = LRUCache(maxsize=1024)
 
 
-@router.get("/{tok_id:path}", response_model=UndertrainedResponse)
+def _evict(tok_id: str) -> None:
+    _undertrained_cache.pop(tok_id)
+    _page_cache.evict_matching(lambda key: key[0] == tok_id)
+
+
+registry.on_unload(_evict)
+
+
+@router.get("/{tok_id:path}")
 async def get_undertrained(
     tok_id: str,
     page: int = Query(1, ge=1),
     page_size: int = Query(100, ge=1, le=1000),
 ):
+    key = (tok_id, page, page_size)
+    cached = _page_cache.get(key)
+    if cached is not None:
+        return Response(content=cached, media_type="application/json")
+
     adapter = registry.get(tok_id)
     if adapter is None:
         raise HTTPException(status_code=404, detail=f"Tokenizer '{tok_id}' not loaded")
@@ -22,23 +38,34 @@ async def get_undertrained(
     bpe_available = adapter.tokenizer_type == "bpe"
 
     if not bpe_available:
-        return UndertrainedResponse(
-            tokens=[], total=0, page=1, page_size=page_size, bpe_available=False
-        )
+        return {
+            "tokens": [],
+            "total": 0,
+            "page": 1,
+            "page_size": page_size,
+            "bpe_available": False,
+        }
 
     if tok_id not in _undertrained_cache:
-        _undertrained_cache[tok_id] = detect_undertrained_tokens(adapter)
+        # Usually already built by the registry's background precompute;
+        # a cold hit submits the scan and concurrent hits share the future
+        _undertrained_cache[tok_id] = await precompute.result(
+            tok_id, adapter, "undertrained"
+        )
 
-    all_tokens = _undertrained_cache[tok_id]
-    total = len(all_tokens)
+    table = _undertrained_cache[tok_id]
+    total = len(table)
     start = (page - 1) * page_size
     end = start + page_size
-    page_tokens = all_tokens[start:end]
-
-    return UndertrainedResponse(
-        tokens=[UndertrainedToken(**t) for t in page_tokens],
-        total=total,
-        page=page,
-        page_size=page_size,
-        bpe_available=True,
+    page_tokens = table.rows(range(start, min(end, total)))
+
+    cached = _page_cache[key] = orjson.dumps(
+        {
+            "tokens": page_tokens,
+            "total": total,
+            "page": page,
+            "page_size": page_size,
+            "bpe_available": True,
+        }
     )
+    return Response(content=cached, media_type="application/json")
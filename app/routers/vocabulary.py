@@ -1,38 +1,103 @@
-import unicodedata
+import numpy as np
+import orjson
+from fastapi import APIRouter, HTTPException, Query, Response
 
-from fastapi import APIRouter, HTTPException, Query
-
-from app.models.schemas import VocabEntry, VocabResponse, VocabStatsResponse
+from app.models.schemas import VocabStatsResponse
+from app.services.cache import LRUCache
 from app.services.registry import registry
+from app.services.scripts import dominant_script, token_script_codes
+from app.services.trigram import TrigramIndex
 
 router = APIRouter(prefix="/api/vocab", tags=["vocabulary"])
 
-
-def _classify_script(token_str: str) -> str:
-    """Classify the dominant Unicode script of a token."""
-    scripts: dict[str, int] = {}
-    for ch in token_str:
-        cat = unicodedata.category(ch)
-        if cat.startswith("L"):
-            try:
-                script = unicodedata.name(ch, "").split(" ")[0]
-            except ValueError:
-                script = "Unknown"
-        elif cat.startswith("N"):
-            script = "Digit"
-        elif cat.startswith("P") or cat.startswith("S"):
-            script = "Punctuation"
-        elif cat.startswith("Z") or cat.startswith("C"):
-            script = "Control/Space"
-        else:
-            script = "Other"
-        scripts[script] = scripts.get(script, 0) + 1
-
-    if not scripts:
-        return "Empty"
-    return max(scripts, key=lambda s: scripts[s])
-
-
+# tok_id -> dominant script per token, in vocab iteration order; the same
+# tokens recur on every page request, so classify a vocabulary only once
+_script_cache = LRUCache(maxsize=8)
+# tok_id -> materialized vocab entries with memoized sort orders
+_index_cache = LRUCache(maxsize=8)
+# tok_id -> int32 array of per-token byte lengths
+_lens_cache = LRUCache(maxsize=8)
+
+
+def _evict(tok_id: str) -> None:
+    _script_cache.pop(tok_id)
+    _index_cache.pop(tok_id)
+    _lens_cache.pop(tok_id)
+
+
+registry.on_unload(_evict)
+
+
+def _classify_tokens(tok_id: str, tokens: list[str]) -> list[str]:
+    """Dominant Unicode script per token, via one vectorized table gather."""
+    scripts = _script_cache.get(tok_id)
+    if scripts is None:
+        per_token, names = token_script_codes(tokens, "vocab")
+        scripts = _script_cache[tok_id] = [
+            dominant_script(codes, names) for codes in per_token
+        ]
+    return scripts
+
+
+class _VocabIndex:
+    """Vocab entries materialized once per tokenizer.
+
+    Entries are orjson-ready dicts shared by every page; sort orders are
+    index permutations memoized per (sort_by, sort_dir), and the lowercase
+    shadow list makes search a plain substring scan.
+    """
+
+    def __init__(self, tok_id: str, vocab: dict[str, int]):
+        scripts = _classify_tokens(tok_id, list(vocab))
+        self.entries: list[dict] = []
+        self.lower_strs: list[str] = []
+        for (token_str, token_id), script in zip(vocab.items(), scripts):
+            token_bytes = token_str.encode("utf-8", errors="replace")
+            self.entries.append(
+                {
+                    "id": token_id,
+                    "token_str": token_str,
+                    "token_bytes_hex": token_bytes.hex(),
+                    "byte_length": len(token_bytes),
+                    "script": script,
+                }
+            )
+            self.lower_strs.append(token_str.lower())
+        self._orders: dict[tuple[str, str], list[int]] = {}
+        # Lazily built trigram index over lowercase tokens
+        self._trigrams: TrigramIndex | None = None
+
+    def order(self, sort_by: str, sort_dir: str) -> list[int]:
+        key = (sort_by, sort_dir)
+        if key not in self._orders:
+            indices = list(range(len(self.entries)))
+            if sort_by in ("id", "byte_length", "token_str"):
+                entries = self.entries
+                indices.sort(
+                    key=lambda i: entries[i][sort_by], reverse=sort_dir == "desc"
+                )
+            self._orders[key] = indices
+        return self._orders[key]
+
+    def search_candidates(self, query: str) -> np.ndarray | None:
+        """Narrow substring-search candidates via the shared trigram index.
+
+        Returns None when the query is too short for the index (callers fall
+        back to a full scan); otherwise a sorted array of candidate indices
+        that still need the final substring check.
+        """
+        if len(query) < 3:
+            return None
+        if self._trigrams is None:
+            self._trigrams = TrigramIndex(self.lower_strs)
+        return self._trigrams.candidates(query)
+
+
+def _get_index(tok_id: str, vocab: dict[str, int]) -> _VocabIndex:
+    index = _index_cache.get(tok_id)
+    if index is None:
+        index = _index_cache[tok_id] = _VocabIndex(tok_id, vocab)
+    return index
 
 
 @router.get("/stats/{tok_id:path}", response_model=VocabStatsResponse)
@@ -42,18 +107,28 @@ async def get_vocab_stats(tok_id: str):
         raise HTTPException(status_code=404, detail=f"Tokenizer '{tok_id}' not loaded")
 
     vocab = adapter.get_vocab()
-    length_dist: dict[int, int] = {}
-    script_dist: dict[str, int] = {}
-    total_length = 0
-    max_length = 0
+    tokens = list(vocab)
+
+    lens = _lens_cache.get(tok_id)
+    if lens is None:
+        # ASCII tokens dominate most vocabularies and need no encode call
+        lens = _lens_cache[tok_id] = np.fromiter(
+            (
+                len(t) if t.isascii() else len(t.encode("utf-8", errors="replace"))
+                for t in tokens
+            ),
+            dtype=np.int32,
+            count=len(tokens),
+        )
 
-    for token_str in vocab:
-        b_len = len(token_str.encode("utf-8", errors="replace"))
-        total_length += b_len
-        max_length = max(max_length, b_len)
-        length_dist[b_len] = length_dist.get(b_len, 0) + 1
+    # C-level aggregation instead of a Python histogram loop
+    counts = np.bincount(lens) if len(lens) else np.empty(0, dtype=np.int64)
+    length_dist = {int(i): int(c) for i, c in enumerate(counts) if c}
+    total_length = int(lens.sum()) if len(lens) else 0
+    max_length = int(lens.max()) if len(lens) else 0
 
-        script = _classify_script(token_str)
+    script_dist: dict[str, int] = {}
+    for script in _classify_tokens(tok_id, tokens):
         script_dist[script] = script_dist.get(script, 0) + 1
 
     vocab_size = len(vocab)
@@ -66,50 +141,48 @@ async def get_vocab_stats(tok_id: str):
     )
 
 
-@router.get("/{tok_id:path}", response_model=VocabResponse)
+@router.get("/{tok_id:path}")
 async def get_vocab(
     tok_id: str,
     page: int = Query(1, ge=1),
     page_size: int = Query(100, ge=1, le=1000),
     search: str = Query(""),
-    sort_by: str = Query("id"),
-    sort_dir: str = Query("asc"),
+    sort_by: str = Query("id", pattern="^(id|byte_length|token_str)$"),
+    sort_dir: str = Query("asc", pattern="^(asc|desc)$"),
 ):
     adapter = registry.get(tok_id)
     if adapter is None:
         raise HTTPException(status_code=404, detail=f"Tokenizer '{tok_id}' not loaded")
 
-    vocab = adapter.get_vocab()
-    entries = []
-    for token_str, token_id in vocab.items():
-        token_bytes = token_str.encode("utf-8", errors="replace")
-        entries.append(
-            VocabEntry(
-                id=token_id,
-                token_str=token_str,
-                token_bytes_hex=token_bytes.hex(),
-                byte_length=len(token_bytes),
-                script=_classify_script(token_str),
-            )
-        )
+    # Entries are built once per tokenizer; a page request is a memoized
+    # sort order, an optional substring scan, and a slice
+    index = _get_index(tok_id, adapter.get_vocab())
+    order = index.order(sort_by, sort_dir)
 
-    # Filter by search
     if search:
         search_lower = search.lower()
-        entries = [e for e in entries if search_lower in e.token_str.lower()]
-
-    # Sort
-    reverse = sort_dir == "desc"
-    if sort_by == "id":
-        entries.sort(key=lambda e: e.id, reverse=reverse)
-    elif sort_by == "byte_length":
-        entries.sort(key=lambda e: e.byte_length, reverse=reverse)
-    elif sort_by == "token_str":
-        entries.sort(key=lambda e: e.token_str, reverse=reverse)
-
-    total = len(entries)
+        lower_strs = index.lower_strs
+        candidates = index.search_candidates(search_lower)
+        if candidates is not None:
+            allowed = np.zeros(len(lower_strs), dtype=bool)
+            allowed[candidates] = True
+            order = [i for i in order if allowed[i] and search_lower in lower_strs[i]]
+        else:
+            order = [i for i in order if search_lower in lower_strs[i]]
+
+    total = len(order)
     start = (page - 1) * page_size
     end = start + page_size
-    page_entries = entries[start:end]
-
-    return VocabResponse(entries=page_entries, total=total, page=page, page_size=page_size)
+    page_entries = [index.entries[i] for i in order[start:end]]
+
+    return Response(
+        content=orjson.dumps(
+            {
+                "entries": page_entries,
+                "total": total,
+                "page": page,
+                "page_size": page_size,
+            }
+        ),
+        media_type="application/json",
+    )
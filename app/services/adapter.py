@@ -1,9 +1,7 @@
 from abc import ABC, abstractmethod
-from functools import lru_cache
 
 
-@lru_cache(maxsize=1)
-def _gpt2_unicode_to_bytes() -> dict[str, int]:
+def _build_gpt2_unicode_to_bytes() -> dict[str, int]:
     """Build the inverse of GPT-2's bytes_to_unicode mapping.
 
     GPT-2 BPE maps each byte value (0-255) to a printable Unicode character
@@ -26,9 +24,36 @@ def _gpt2_unicode_to_bytes() -> dict[str, int]:
     return {chr(c): b for b, c in zip(bs, cs)}
 
 
+def _build_gpt2_translate_table() -> dict[int, int]:
+    """str.translate table undoing GPT-2's byte-to-unicode mapping.
+
+    Maps each GPT-2 vocab character to its raw byte value so that
+    ``token.translate(table).encode("latin-1")`` recovers the token bytes
+    in two C-level calls instead of a Python loop per character. Code
+    points below 256 that are *not* GPT-2 vocab characters map to a
+    sentinel above latin-1 so the encode raises and callers fall back,
+    exactly like the old all-chars-mappable check.
+    """
+    table = {ord(ch): b for ch, b in _GPT2_UNICODE_TO_BYTES.items()}
+    for cp in range(256):
+        if cp not in table:
+            table[cp] = 0xFFFF
+    return table
+
+
+# Nullary builders memoized as module constants: a plain global load is
+# cheaper than an lru_cache hit on every token
+_GPT2_UNICODE_TO_BYTES: dict[str, int] = _build_gpt2_unicode_to_bytes()
+_GPT2_TRANSLATE_TABLE: dict[int, int] = _build_gpt2_translate_table()
+
+
 class TokenizerAdapter(ABC):
     """Unified interface for all tokenizer backends."""
 
+    # Slots on the whole hierarchy drop the per-instance __dict__; the base
+    # keeps __weakref__ so caches can hold adapters weakly
+    __slots__ = ("__weakref__",)
+
     @abstractmethod
     def encode(self, text: str) -> list[int]:
         ...
@@ -81,18 +106,48 @@ class TokenizerAdapter(ABC):
         """Decode a single token ID to string."""
         return self.decode([token_id])
 
+    def decode_batch(self, token_ids: list[int]) -> list[str]:
+        """Decode each token ID individually, in one backend call if possible.
+
+        Equivalent to ``[decode_single(i) for i in token_ids]``; subclasses
+        override to avoid a backend round trip per token.
+        """
+        return [self.decode([tid]) for tid in token_ids]
+
+    def encode_batch(self, texts: list[str]) -> list[list[int]]:
+        """Encode several texts, in one backend call if possible."""
+        return [self.encode(text) for text in texts]
+
     def encode_single_token(self, text: str) -> int | None:
         """Encode text expected to be a single token. Returns None if multi-token."""
         ids = self.encode(text)
         return ids[0] if len(ids) == 1 else None
 
+    #: Whether concatenating decode_token_bytes over a token sequence
+    #: reproduces decode(ids) exactly. When False, callers that need the
+    #: exact surface forms must diff decoded prefixes instead.
+    byte_exact_decode = False
+
+    def decode_token_bytes(self, token_id: int) -> bytes:
+        """Return the raw bytes a single token contributes to the decoded text.
+
+        Used for incremental decoding; the concatenation over a token sequence
+        reproduces decode(ids) for byte-level tokenizers.
+        """
+        return self.decode([token_id]).encode("utf-8", errors="replace")
+
 
 class TiktokenAdapter(TokenizerAdapter):
+    __slots__ = ("_encoding", "_name", "_vocab", "_merges")
+
+    byte_exact_decode = True
+
     def __init__(self, encoding_name: str):
         import tiktoken
         self._encoding = tiktoken.get_encoding(encoding_name)
         self._name = encoding_name
         self._vocab: dict[str, int] | None = None
+        self._merges: list[tuple[str, str]] | None = None
 
     def encode(self, text: str) -> list[int]:
         return self._encoding.encode(text, allowed_special="all")
@@ -100,6 +155,18 @@ class TiktokenAdapter(TokenizerAdapter):
     def decode(self, ids: list[int]) -> str:
         return self._encoding.decode(ids)
 
+    def decode_token_bytes(self, token_id: int) -> bytes:
+        return self._encoding.decode_single_token_bytes(token_id)
+
+    def decode_batch(self, token_ids: list[int]) -> list[str]:
+        return [
+            b.decode("utf-8", errors="replace")
+            for b in self._encoding.decode_tokens_bytes(token_ids)
+        ]
+
+    def encode_batch(self, texts: list[str]) -> list[list[int]]:
+        return self._encoding.encode_batch(texts, allowed_special="all")
+
     def get_vocab(self) -> dict[str, int]:
         if self._vocab is None:
             self._vocab = {}
@@ -116,34 +183,43 @@ class TiktokenAdapter(TokenizerAdapter):
 
     def get_merges(self) -> list[tuple[str, str]] | None:
         # tiktoken stores merges implicitly via rank ordering of _mergeable_ranks
-        # We can reconstruct merge order from the ranks
-        ranks = self._encoding._mergeable_ranks
-        sorted_tokens = sorted(ranks.items(), key=lambda x: x[1])
-        # Base tokens (single bytes) are ranks 0-255
-        # Everything after is a merge result
-        merges = []
-        for token_bytes, _rank in sorted_tokens:
-            if len(token_bytes) <= 1:
-                continue
-            # Find the split point that uses the highest-ranked pair
-            best_split = None
-            best_max_rank = -1
-            for i in range(1, len(token_bytes)):
-                left = token_bytes[:i]
-                right = token_bytes[i:]
-                if left in ranks and right in ranks:
-                    max_rank = max(ranks[left], ranks[right])
-                    if best_split is None or max_rank < best_max_rank:
+        # We can reconstruct merge order from the ranks; memoized since the
+        # reconstruction scans every split of every token
+        if self._merges is None:
+            ranks = self._encoding._mergeable_ranks
+            ranks_get = ranks.get
+            sorted_tokens = sorted(ranks.items(), key=lambda x: x[1])
+            # Base tokens (single bytes) are ranks 0-255
+            # Everything after is a merge result
+            merges = []
+            for token_bytes, _rank in sorted_tokens:
+                if len(token_bytes) <= 1:
+                    continue
+                # Find the split point that uses the highest-ranked pair
+                best_i = 0
+                best_max_rank = -1
+                for i in range(1, len(token_bytes)):
+                    left_rank = ranks_get(token_bytes[:i])
+                    if left_rank is None:
+                        continue
+                    right_rank = ranks_get(token_bytes[i:])
+                    if right_rank is None:
+                        continue
+                    max_rank = left_rank if left_rank > right_rank else right_rank
+                    if best_i == 0 or max_rank < best_max_rank:
                         best_max_rank = max_rank
-                        best_split = (left, right)
-            if best_split:
-                left_str = best_split[0].decode("utf-8", errors="replace")
-                right_str = best_split[1].decode("utf-8", errors="replace")
-                merges.append((left_str, right_str))
-        return merges
+                        best_i = i
+                if best_i:
+                    left_str = token_bytes[:best_i].decode("utf-8", errors="replace")
+                    right_str = token_bytes[best_i:].decode("utf-8", errors="replace")
+                    merges.append((left_str, right_str))
+            self._merges = merges
+        return self._merges
 
     def get_merge_ranks(self) -> dict[bytes, int] | None:
-        return dict(self._encoding._mergeable_ranks)
+        # Callers only read the ranks, so hand out the backend dict directly
+        # instead of copying 100k+ entries per request
+        return self._encoding._mergeable_ranks
 
     def vocab_size(self) -> int:
         return self._encoding.n_vocab
@@ -165,11 +241,16 @@ class TiktokenAdapter(TokenizerAdapter):
 
 
 class HuggingFaceAdapter(TokenizerAdapter):
+    __slots__ = ("_tokenizer", "_model_name", "_vocab", "_type", "_merges", "_merge_ranks", "_vocab_size", "_byte_level")
+
     def __init__(self, model_name: str):
         from transformers import AutoTokenizer
         self._tokenizer = AutoTokenizer.from_pretrained(model_name, trust_remote_code=True)
         self._model_name = model_name
         self._vocab: dict[str, int] | None = None
+        self._merges: list[tuple[str, str]] | None = None
+        self._merge_ranks: dict[bytes, int] | None = None
+        self._vocab_size: int | None = None
         # Determine type
         self._type = "bpe"
         if hasattr(self._tokenizer, "backend_tokenizer"):
@@ -179,12 +260,46 @@ class HuggingFaceAdapter(TokenizerAdapter):
                 self._type = "unigram"
             elif "wordpiece" in model_type:
                 self._type = "wordpiece"
+        # Byte-level BPE (GPT-2 style) is the only family whose vocab
+        # strings map 1:1 to raw bytes; other backends (WordPiece "##",
+        # SentencePiece "▁") need the decode fallback
+        self._byte_level = hasattr(self._tokenizer, "byte_decoder")
+        if hasattr(self._tokenizer, "backend_tokenizer"):
+            decoder = self._tokenizer.backend_tokenizer.decoder
+            if decoder is not None and type(decoder).__name__ == "ByteLevel":
+                self._byte_level = True
+
+    @property
+    def byte_exact_decode(self) -> bool:
+        return self._byte_level
+
     def encode(self, text: str) -> list[int]:
         return self._tokenizer.encode(text, add_special_tokens=False)
 
     def decode(self, ids: list[int]) -> str:
         return self._tokenizer.decode(ids)
 
+    def decode_token_bytes(self, token_id: int) -> bytes:
+        if not self._byte_level:
+            # Surface forms carry vocab markers rather than raw bytes;
+            # defer to the backend decode
+            return super().decode_token_bytes(token_id)
+        token = self._tokenizer.convert_ids_to_tokens(token_id)
+        if token is None:
+            return b""
+        try:
+            # Byte-level BPE: each vocab char maps to one raw byte
+            return token.translate(_GPT2_TRANSLATE_TABLE).encode("latin-1")
+        except UnicodeEncodeError:
+            # Special tokens sit outside the byte alphabet
+            return token.encode("utf-8", errors="replace")
+
+    def decode_batch(self, token_ids: list[int]) -> list[str]:
+        return self._tokenizer.batch_decode([[tid] for tid in token_ids])
+
+    def encode_batch(self, texts: list[str]) -> list[list[int]]:
+        return self._tokenizer(texts, add_special_tokens=False)["input_ids"]
+
     def get_vocab(self) -> dict[str, int]:
         if self._vocab is None:
             self._vocab = dict(self._tokenizer.get_vocab())
@@ -193,24 +308,27 @@ class HuggingFaceAdapter(TokenizerAdapter):
     def get_merges(self) -> list[tuple[str, str]] | None:
         if self._type != "bpe":
             return None
-        try:
-            if hasattr(self._tokenizer, "backend_tokenizer"):
-                model = self._tokenizer.backend_tokenizer.model
-                # tokenizers library exposes merges in the model
-                if hasattr(model, "merges"):
-                    return [(m[0], m[1]) for m in model.merges]
-        except Exception:
-            pass
-        return None
+        if self._merges is None:
+            try:
+                if hasattr(self._tokenizer, "backend_tokenizer"):
+                    model = self._tokenizer.backend_tokenizer.model
+                    # tokenizers library exposes merges in the model
+                    if hasattr(model, "merges"):
+                        self._merges = [(m[0], m[1]) for m in model.merges]
+            except Exception:
+                pass
+        return self._merges
 
     def get_merge_ranks(self) -> dict[bytes, int] | None:
         if self._type != "bpe":
             return None
+        if self._merge_ranks is not None:
+            return self._merge_ranks
 
-        # Build the GPT-2 unicode-to-byte mapping.
-        # GPT-2 BPE maps each byte to a printable Unicode char so that
-        # vocab strings are displayable.  E.g. byte 0x20 (space) -> Ġ (U+0120).
-        unicode_to_byte = _gpt2_unicode_to_bytes()
+        # Undo the GPT-2 byte-to-unicode mapping in one C-level translate
+        # per token.  GPT-2 BPE maps each byte to a printable Unicode char
+        # so vocab strings are displayable, e.g. 0x20 (space) -> Ġ (U+0120).
+        trans = _GPT2_TRANSLATE_TABLE
 
         vocab = self._tokenizer.get_vocab()
         ranks: dict[bytes, int] = {}
@@ -219,17 +337,21 @@ class HuggingFaceAdapter(TokenizerAdapter):
                 continue
             try:
                 # Try GPT-2 byte decoding first (each char maps to one byte)
-                if all(ch in unicode_to_byte for ch in token_str):
-                    token_bytes = bytes(unicode_to_byte[ch] for ch in token_str)
-                else:
+                token_bytes = token_str.translate(trans).encode("latin-1")
+            except UnicodeEncodeError:
+                try:
                     token_bytes = token_str.encode("utf-8")
-                ranks[token_bytes] = token_id
-            except Exception:
-                pass
-        return ranks if ranks else None
+                except Exception:
+                    continue
+            ranks[token_bytes] = token_id
+        self._merge_ranks = ranks if ranks else None
+        return self._merge_ranks
 
     def vocab_size(self) -> int:
-        return self._tokenizer.vocab_size
+        # transformers computes this property from the backend vocab
+        if self._vocab_size is None:
+            self._vocab_size = self._tokenizer.vocab_size
+        return self._vocab_size
 
     def token_to_bytes(self, token: str) -> bytes:
         return token.encode("utf-8")
@@ -248,12 +370,15 @@ class HuggingFaceAdapter(TokenizerAdapter):
 
 
 class SentencePieceAdapter(TokenizerAdapter):
+    __slots__ = ("_sp", "_model_path", "_vocab", "_type", "_merges")
+
     def __init__(self, model_path: str):
         import sentencepiece as spm
         self._sp = spm.SentencePieceProcessor()
         self._sp.Load(model_path)
         self._model_path = model_path
         self._vocab: dict[str, int] | None = None
+        self._merges: list[tuple[str, str]] | None = None
         # Determine type from model type
         # SentencePiece model types: 1=unigram, 2=bpe
         model_type = self._sp.piece_to_id("▁") >= 0  # just check if it loaded
@@ -276,6 +401,15 @@ class SentencePieceAdapter(TokenizerAdapter):
     def decode(self, ids: list[int]) -> str:
         return self._sp.Decode(ids)
 
+    def decode_token_bytes(self, token_id: int) -> bytes:
+        return self._sp.IdToPiece(token_id).replace("\u2581", " ").encode("utf-8")
+
+    def decode_batch(self, token_ids: list[int]) -> list[str]:
+        return self._sp.Decode([[tid] for tid in token_ids])
+
+    def encode_batch(self, texts: list[str]) -> list[list[int]]:
+        return self._sp.Encode(texts)
+
     def get_vocab(self) -> dict[str, int]:
         if self._vocab is None:
             self._vocab = {}
@@ -286,24 +420,27 @@ class SentencePieceAdapter(TokenizerAdapter):
     def get_merges(self) -> list[tuple[str, str]] | None:
         if self._type != "bpe":
             return None
-        try:
-            import sentencepiece.sentencepiece_model_pb2 as sp_model
-            with open(self._model_path, "rb") as f:
-                m = sp_model.ModelProto()
-                m.ParseFromString(f.read())
-                merges = []
-                for piece in m.pieces:
-                    if piece.type == 1 and len(piece.piece) > 1:
-                        # Try to find best split
-                        p = piece.piece
-                        for i in range(1, len(p)):
-                            left, right = p[:i], p[i:]
-                            if left in self._vocab and right in self._vocab:
-                                merges.append((left, right))
-                                break
-                return merges if merges else None
-        except Exception:
-            return None
+        if self._merges is None:
+            # Memoized: each cold call re-reads and re-parses the model file
+            try:
+                import sentencepiece.sentencepiece_model_pb2 as sp_model
+                with open(self._model_path, "rb") as f:
+                    m = sp_model.ModelProto()
+                    m.ParseFromString(f.read())
+                    merges = []
+                    for piece in m.pieces:
+                        if piece.type == 1 and len(piece.piece) > 1:
+                            # Try to find best split
+                            p = piece.piece
+                            for i in range(1, len(p)):
+                                left, right = p[:i], p[i:]
+                                if left in self._vocab and right in self._vocab:
+                                    merges.append((left, right))
+                                    break
+                    self._merges = merges if merges else None
+            except Exception:
+                return None
+        return self._merges
 
     def vocab_size(self) -> int:
         return self._sp.GetPieceSize()
@@ -325,6 +462,8 @@ class SentencePieceAdapter(TokenizerAdapter):
 
 
 class TokenMonsterAdapter(TokenizerAdapter):
+    __slots__ = ("_vocab", "_vocab_name", "_vocab_dict")
+
     def __init__(self, vocab_name: str):
         import tokenmonster
         self._vocab = tokenmonster.load(vocab_name)
@@ -0,0 +1,47 @@
+"""Bounded LRU caches for per-tokenizer analysis results.
+
+Module-level analysis caches used to be plain dicts that grew without
+bound as tokenizers were loaded and evicted. ``LRUCache`` gives them a
+size cap, and routers register eviction callbacks with the registry so
+results for an unloaded tokenizer are dropped immediately.
+"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import Any, Callable
+
+
+class LRUCache:
+    """Mapping with a maximum size and least-recently-used eviction."""
+
+    def __init__(self, maxsize: int):
+        self._data: OrderedDict[Any, Any] = OrderedDict()
+        self._maxsize = maxsize
+
+    def __contains__(self, key) -> bool:
+        return key in self._data
+
+    def __getitem__(self, key):
+        value = self._data[key]
+        self._data.move_to_end(key)
+        return value
+
+    def __setitem__(self, key, value) -> None:
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if len(self._data) > self._maxsize:
+            self._data.popitem(last=False)
+
+    def get(self, key, default=None):
+        if key in self._data:
+            return self[key]
+        return default
+
+    def pop(self, key, default=None):
+        return self._data.pop(key, default)
+
+    def evict_matching(self, predicate: Callable[[Any], bool]) -> None:
+        """Drop every entry whose key satisfies the predicate."""
+        for key in [k for k in self._data if predicate(k)]:
+            del self._data[key]
@@ -1,3 +1,8 @@
+import asyncio
+import heapq
+import weakref
+from collections import Counter
+
 from app.services.adapter import TokenizerAdapter
 
 DEFAULT_SAMPLE_TEXTS = [
@@ -14,58 +19,92 @@ DEFAULT_SAMPLE_TEXTS = [
 ]
 
 
-def compute_overlap(adapters: dict[str, TokenizerAdapter]) -> dict:
+# adapter -> frozenset of its vocab tokens; weak keys so the cached set
+# goes away with the adapter when the registry evicts it
+_vocab_set_cache: "weakref.WeakKeyDictionary[TokenizerAdapter, frozenset[str]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _vocab_set(adapter: TokenizerAdapter) -> frozenset[str]:
+    tokens = _vocab_set_cache.get(adapter)
+    if tokens is None:
+        tokens = _vocab_set_cache[adapter] = frozenset(adapter.get_vocab())
+    return tokens
+
+
+async def compute_overlap(adapters: dict[str, TokenizerAdapter]) -> dict:
     """Compute vocabulary overlap between tokenizers."""
-    vocab_sets: dict[str, set[str]] = {}
-    for tok_id, adapter in adapters.items():
-        vocab_sets[tok_id] = set(adapter.get_vocab().keys())
+    # Cold get_vocab calls materialize full vocabularies in C extensions;
+    # fan them out across threads instead of running serially on the loop
+    vocab_sets_list = await asyncio.gather(
+        *(asyncio.to_thread(_vocab_set, adapter) for adapter in adapters.values())
+    )
+    vocab_sets: dict[str, frozenset[str]] = dict(zip(adapters, vocab_sets_list))
 
     all_ids = list(vocab_sets.keys())
 
-    # Compute intersection of all
-    shared = set.intersection(*vocab_sets.values()) if vocab_sets else set()
-    union = set.union(*vocab_sets.values()) if vocab_sets else set()
+    # One occurrence count per token replaces the per-tokenizer set unions
+    # (T unions over 100k-token vocabs is millions of hashed insertions)
+    occurrences: Counter[str] = Counter()
+    for vocab in vocab_sets.values():
+        occurrences.update(vocab)
+
+    n_tokenizers = len(vocab_sets)
+    shared = {t for t, c in occurrences.items() if c == n_tokenizers}
+    union_count = len(occurrences)
 
-    # Unique per tokenizer
-    unique_per = {}
-    for tok_id, vocab in vocab_sets.items():
-        others = set.union(*(v for k, v in vocab_sets.items() if k != tok_id))
-        unique_per[tok_id] = len(vocab - others)
+    # Unique per tokenizer: tokens no other tokenizer contains
+    unique_per = {
+        tok_id: sum(1 for t in vocab if occurrences[t] == 1)
+        for tok_id, vocab in vocab_sets.items()
+    }
 
-    overlap_pct = (len(shared) / max(len(union), 1)) * 100
+    overlap_pct = (len(shared) / max(union_count, 1)) * 100
 
     return {
         "shared_tokens": len(shared),
         "unique_per_tokenizer": unique_per,
-        "total_union": len(union),
+        "total_union": union_count,
         "overlap_percentage": round(overlap_pct, 2),
-        "shared_sample": sorted(list(shared))[:50],
+        "shared_sample": heapq.nsmallest(50, shared),
         "unique_samples": {
-            tok_id: sorted(list(vocab_sets[tok_id] - shared))[:30]
+            tok_id: heapq.nsmallest(30, vocab_sets[tok_id] - shared)
             for tok_id in all_ids
         },
     }
 
 
+# adapter -> {token_id: display dict}; weak keys so memoized tokens go
+# away with the adapter when the registry evicts it
+_token_display_cache: "weakref.WeakKeyDictionary[TokenizerAdapter, dict[int, dict]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
 def compare_tokenization(
     adapters: dict[str, TokenizerAdapter], text: str
 ) -> list[dict]:
     """Compare how different tokenizers tokenize the same text."""
     results = []
     for tok_id, adapter in adapters.items():
+        # Decode and hex-encode each token id once per adapter; common
+        # tokens repeat constantly across comparison requests
+        memo = _token_display_cache.setdefault(adapter, {})
         token_ids = adapter.encode(text)
-        tokens = []
-        for tid in token_ids:
-            token_str = adapter.decode_single(tid)
-            token_bytes = token_str.encode("utf-8", errors="replace")
-            tokens.append(
-                {
+        # One batched backend call for the ids not seen before, instead of
+        # an FFI round trip per token
+        missing = [tid for tid in dict.fromkeys(token_ids) if tid not in memo]
+        if missing:
+            for tid, token_str in zip(missing, adapter.decode_batch(missing)):
+                token_bytes = token_str.encode("utf-8", errors="replace")
+                memo[tid] = {
                     "id": tid,
                     "token_str": token_str,
                     "token_bytes_hex": token_bytes.hex(),
                     "byte_length": len(token_bytes),
                 }
-            )
+        tokens = [memo[tid] for tid in token_ids]
         results.append(
             {
                 "tokenizer_id": tok_id,
@@ -76,36 +115,37 @@ def compare_tokenization(
     return results
 
 
-def compute_efficiency(
+def _efficiency_for_one(
+    tok_id: str, adapter: TokenizerAdapter, texts: list[str]
+) -> dict:
+    token_lists = adapter.encode_batch(texts)
+    total_tokens = sum(len(ids) for ids in token_lists)
+    total_chars = sum(len(text) for text in texts)
+    total_words = sum(len(text.split()) for text in texts)
+
+    avg_tokens_per_word = total_tokens / max(total_words, 1)
+    avg_token_length = total_chars / max(total_tokens, 1)
+
+    return {
+        "tokenizer_id": tok_id,
+        "avg_tokens_per_word": round(avg_tokens_per_word, 3),
+        "avg_token_length_chars": round(avg_token_length, 3),
+        "total_tokens": total_tokens,
+        "total_chars": total_chars,
+    }
+
+
+async def compute_efficiency(
     adapters: dict[str, TokenizerAdapter],
     sample_texts: list[str] | None = None,
 ) -> list[dict]:
     """Compare tokenization efficiency across tokenizers."""
     texts = sample_texts or DEFAULT_SAMPLE_TEXTS
-
-    results = []
-    for tok_id, adapter in adapters.items():
-        total_tokens = 0
-        total_chars = 0
-        total_words = 0
-
-        for text in texts:
-            token_ids = adapter.encode(text)
-            total_tokens += len(token_ids)
-            total_chars += len(text)
-            total_words += len(text.split())
-
-        avg_tokens_per_word = total_tokens / max(total_words, 1)
-        avg_token_length = total_chars / max(total_tokens, 1)
-
-        results.append(
-            {
-                "tokenizer_id": tok_id,
-                "avg_tokens_per_word": round(avg_tokens_per_word, 3),
-                "avg_token_length_chars": round(avg_token_length, 3),
-                "total_tokens": total_tokens,
-                "total_chars": total_chars,
-            }
+    # Encode calls release the GIL in the Rust/C backends, so running one
+    # thread per tokenizer cuts latency by roughly the tokenizer count
+    return await asyncio.gather(
+        *(
+            asyncio.to_thread(_efficiency_for_one, tok_id, adapter, texts)
+            for tok_id, adapter in adapters.items()
         )
-
-    return results
+    )
@@ -1,78 +1,25 @@
-import unicodedata
-
 from app.services.adapter import TokenizerAdapter
+from app.services.scripts import SCRIPT_ALIASES, token_script_codes
 
-# Map Unicode script names to readable categories
-SCRIPT_ALIASES = {
-    "LATIN": "Latin",
-    "CJK": "CJK",
-    "HANGUL": "Korean",
-    "HIRAGANA": "Japanese (Hiragana)",
-    "KATAKANA": "Japanese (Katakana)",
-    "ARABIC": "Arabic",
-    "DEVANAGARI": "Devanagari",
-    "CYRILLIC": "Cyrillic",
-    "GREEK": "Greek",
-    "HEBREW": "Hebrew",
-    "THAI": "Thai",
-    "GEORGIAN": "Georgian",
-    "ARMENIAN": "Armenian",
-    "BENGALI": "Bengali",
-    "TAMIL": "Tamil",
-    "TELUGU": "Telugu",
-    "KANNADA": "Kannada",
-    "MALAYALAM": "Malayalam",
-    "GUJARATI": "Gujarati",
-    "GURMUKHI": "Gurmukhi",
-    "ETHIOPIC": "Ethiopic",
-    "TIBETAN": "Tibetan",
-    "MYANMAR": "Myanmar",
-    "KHMER": "Khmer",
-    "LAO": "Lao",
-    "SINHALA": "Sinhala",
-}
-
-
-def _char_script(ch: str) -> str:
-    """Get the script category of a character."""
-    cat = unicodedata.category(ch)
-    if cat.startswith("L") or cat.startswith("M"):
-        try:
-            name = unicodedata.name(ch, "UNKNOWN")
-            # Extract script from Unicode name
-            first_word = name.split(" ")[0]
-            return SCRIPT_ALIASES.get(first_word, first_word.title())
-        except ValueError:
-            return "Unknown"
-    elif cat.startswith("N"):
-        return "Digit"
-    elif cat.startswith("P"):
-        return "Punctuation"
-    elif cat.startswith("S"):
-        return "Symbol"
-    elif cat.startswith("Z"):
-        return "Whitespace"
-    elif cat.startswith("C"):
-        return "Control"
-    else:
-        return "Other"
+__all__ = ["SCRIPT_ALIASES", "compute_language_composition"]
 
 
 def compute_language_composition(adapter: TokenizerAdapter) -> dict:
     """Compute script/language composition of the vocabulary."""
     vocab = adapter.get_vocab()
+    tokens = list(vocab)
+    # One vectorized table gather for the whole vocabulary instead of a
+    # unicodedata call per character
+    per_token, names = token_script_codes(tokens, "language")
+
     script_counts: dict[str, int] = {}
     script_examples: dict[str, list[str]] = {}
     mixed_count = 0
     total = 0
 
-    for token_str in vocab:
+    for token_str, codes in zip(tokens, per_token):
         total += 1
-        # Classify each character
-        char_scripts = set()
-        for ch in token_str:
-            s = _char_script(ch)
-            char_scripts.add(s)
+        char_scripts = {names[c] for c in set(codes)}
 
         # Ignore whitespace/control-only tokens for script classification
         meaningful_scripts = char_scripts - {"Whitespace", "Control", "Other"}
@@ -3,153 +3,264 @@
 Each multi-byte token is decomposed into its optimal left+right split,
 forming a forest of binary trees rooted at tokens that never appear as
 children of another merge.
+
+The forest is stored struct-of-arrays: parallel numpy columns plus
+Python lists for the variable-length strings, with children referenced
+by entry index. A 100k-entry forest is a handful of flat arrays instead
+of 100k Python objects, and mask/argsort queries run at C level.
 """
 
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from app.services.cache import LRUCache
+from app.services.trigram import TrigramIndex
 
 
 @dataclass
-class MergeEntry:
-    token_bytes: bytes
-    rank: int
-    left_bytes: bytes | None = None
-    right_bytes: bytes | None = None
-    left_rank: int = -1
-    right_rank: int = -1
-    is_leaf: bool = False
-    is_root: bool = True
+class ForestIndex:
+    """Merge forest plus precomputed per-tokenizer query indexes.
 
-    def token_str(self) -> str:
-        return self.token_bytes.decode("utf-8", errors="replace")
+    Entries live in parallel columns; ``left_idx``/``right_idx`` are -1
+    for leaves. Sort permutations and masks make a paginated request a
+    mask + slice instead of a full Python rescan of all entries.
+    """
 
-    def token_hex(self) -> str:
-        return self.token_bytes.hex()
+    token_bytes: list[bytes]
+    token_strs: list[str]
+    lower_strs: list[str]
+    hex_strs: list[str]
+    ranks: np.ndarray
+    byte_lens: np.ndarray
+    left_idx: np.ndarray
+    right_idx: np.ndarray
+    leaf_mask: np.ndarray
+    merge_mask: np.ndarray
+    root_mask: np.ndarray
+    # (sort_by, sort_dir) -> permutation of entry indices
+    sort_orders: dict[tuple[str, str], np.ndarray]
+    # rank -> entry index, for O(1) subtree lookups
+    rank_to_index: dict[int, int]
+    total_leaves: int
+    total_merges: int
+    total_roots: int
+    # Lazily built trigram index over token and hex strings
+    _trigrams: TrigramIndex | None = None
+    # Lazily built (sort_by, sort_dir) -> permutation of root merge indices
+    _root_orders: dict[tuple[str, str], np.ndarray] | None = None
+    # Lazily built entry index -> memoized subtree node dict
+    _subtree_cache: dict[int, dict] = field(default_factory=dict)
 
+    def __len__(self) -> int:
+        return len(self.token_bytes)
 
-def build_merge_entries(ranks: dict[bytes, int]) -> list[MergeEntry]:
-    """Build a flat list of merge entries from a ranks dictionary.
+    def entry_dict(self, i: int) -> dict:
+        """Flat orjson-ready dict for one entry, children included."""
+        li = int(self.left_idx[i])
+        ri = int(self.right_idx[i])
+        return {
+            "token": self.token_strs[i],
+            "token_hex": self.hex_strs[i],
+            "rank": int(self.ranks[i]),
+            "byte_length": int(self.byte_lens[i]),
+            "is_leaf": bool(self.leaf_mask[i]),
+            "is_root": bool(self.root_mask[i]),
+            "left": self.token_strs[li] if li >= 0 else None,
+            "left_hex": self.hex_strs[li] if li >= 0 else None,
+            "left_rank": int(self.ranks[li]) if li >= 0 else None,
+            "right": self.token_strs[ri] if ri >= 0 else None,
+            "right_hex": self.hex_strs[ri] if ri >= 0 else None,
+            "right_rank": int(self.ranks[ri]) if ri >= 0 else None,
+        }
 
-    For each multi-byte token, find the optimal split point where both
-    halves exist in ranks and max(left_rank, right_rank) is minimized.
-    """
-    entries: list[MergeEntry] = []
-    children: set[bytes] = set()
-
-    for token_bytes, rank in ranks.items():
-        if len(token_bytes) <= 1:
-            entries.append(MergeEntry(
-                token_bytes=token_bytes,
-                rank=rank,
-                is_leaf=True,
-            ))
-            continue
+    def subtree(self, i: int) -> dict:
+        """Merge tree for an entry, reusing the splits already in the columns.
 
-        best_split = _find_split(ranks, token_bytes)
-
-        if best_split is not None:
-            left_b, right_b = best_split
-            children.add(left_b)
-            children.add(right_b)
-            entries.append(MergeEntry(
-                token_bytes=token_bytes,
-                rank=rank,
-                left_bytes=left_b,
-                right_bytes=right_b,
-                left_rank=ranks[left_b],
-                right_rank=ranks[right_b],
-            ))
-        else:
-            # No valid split found — treat as leaf
-            entries.append(MergeEntry(
-                token_bytes=token_bytes,
-                rank=rank,
-                is_leaf=True,
-            ))
+        Nodes are memoized on the index and shared between trees, so each
+        token's subtree is assembled once instead of re-running the split
+        search recursively on every request.
+        """
+        cache = self._subtree_cache
+        left_idx = self.left_idx
+        right_idx = self.right_idx
+
+        stack = [i]
+        while stack:
+            j = stack.pop()
+            if j in cache:
+                continue
+            li = int(left_idx[j])
+            ri = int(right_idx[j])
+            if li < 0:
+                cache[j] = {
+                    "token": self.token_strs[j],
+                    "token_hex": self.hex_strs[j],
+                    "rank": int(self.ranks[j]),
+                    "is_leaf": True,
+                }
+            elif li in cache and ri in cache:
+                cache[j] = {
+                    "token": self.token_strs[j],
+                    "token_hex": self.hex_strs[j],
+                    "rank": int(self.ranks[j]),
+                    "is_leaf": False,
+                    "left": cache[li],
+                    "right": cache[ri],
+                }
+            else:
+                stack.append(j)
+                stack.append(li)
+                stack.append(ri)
+        return cache[i]
+
+    def root_orders(self) -> dict[tuple[str, str], np.ndarray]:
+        """Sort permutations over root merge entries (connected-component roots).
+
+        Built once per tokenizer: tree depths are computed bottom-up in a
+        single pass (children are shorter than parents, so visiting entries
+        by byte length sees them first), then each requested ordering is a
+        cached argsort instead of an N·log N lambda sort per request.
+        """
+        if self._root_orders is None:
+            left_idx = self.left_idx
+            right_idx = self.right_idx
+            depths = np.ones(len(self.token_bytes), dtype=np.int32)
+            for j in np.argsort(self.byte_lens, kind="stable").tolist():
+                li = left_idx[j]
+                if li >= 0:
+                    depths[j] = 1 + max(depths[li], depths[right_idx[j]])
 
-    # Mark non-root entries
-    for entry in entries:
-        if entry.token_bytes in children:
-            entry.is_root = False
+            roots = np.flatnonzero(self.root_mask & self.merge_mask)
+            rank_asc = roots[np.argsort(self.ranks[roots], kind="stable")]
+            len_asc = roots[np.argsort(self.byte_lens[roots], kind="stable")]
+            depth_asc = roots[np.argsort(depths[roots], kind="stable")]
+            self._root_orders = {
+                ("rank", "asc"): rank_asc,
+                ("rank", "desc"): rank_asc[::-1],
+                ("byte_length", "asc"): len_asc,
+                ("byte_length", "desc"): len_asc[::-1],
+                ("depth", "asc"): depth_asc,
+                ("depth", "desc"): depth_asc[::-1],
+            }
+        return self._root_orders
 
-    return entries
+    def search_candidates(self, query: str) -> np.ndarray | None:
+        """Narrow substring-search candidates via the shared trigram index.
 
+        Returns None when the query is too short for the index (callers fall
+        back to a full scan); otherwise a sorted array of candidate indices
+        that still need the final substring check.
+        """
+        if len(query) < 3:
+            return None
+        if self._trigrams is None:
+            self._trigrams = TrigramIndex(self.lower_strs, self.hex_strs)
+        return self._trigrams.candidates(query)
 
-def _find_split(ranks: dict[bytes, int], token_bytes: bytes) -> tuple[bytes, bytes] | None:
-    """Find the optimal BPE split for a multi-byte token."""
-    best_split: tuple[bytes, bytes] | None = None
-    best_max_rank = float("inf")
+
+def _find_split(ranks: dict[bytes, int], token_bytes: bytes) -> int:
+    """Find the optimal BPE split index for a multi-byte token, 0 if none.
+
+    The best split is the one where both halves exist in ranks and
+    max(left_rank, right_rank) is minimized.
+    """
+    best_i = 0
+    best_max_rank = -1
+    ranks_get = ranks.get
     for i in range(1, len(token_bytes)):
-        left = token_bytes[:i]
-        right = token_bytes[i:]
-        if left in ranks and right in ranks:
-            max_rank = max(ranks[left], ranks[right])
-            if max_rank < best_max_rank:
-                best_max_rank = max_rank
-                best_split = (left, right)
-    return best_split
-
-
-def get_subtree(ranks: dict[bytes, int], token_bytes: bytes) -> dict:
-    """Recursively decompose a token into its full merge tree."""
-    rank = ranks.get(token_bytes, -1)
-    token_str = token_bytes.decode("utf-8", errors="replace")
-    token_hex = token_bytes.hex()
-
-    if len(token_bytes) <= 1:
-        return {
-            "token": token_str,
-            "token_hex": token_hex,
-            "rank": rank,
-            "is_leaf": True,
-        }
+        left_rank = ranks_get(token_bytes[:i])
+        if left_rank is None:
+            continue
+        right_rank = ranks_get(token_bytes[i:])
+        if right_rank is None:
+            continue
+        max_rank = left_rank if left_rank > right_rank else right_rank
+        if best_i == 0 or max_rank < best_max_rank:
+            best_max_rank = max_rank
+            best_i = i
+    return best_i
 
-    split = _find_split(ranks, token_bytes)
-    if split is None:
-        return {
-            "token": token_str,
-            "token_hex": token_hex,
-            "rank": rank,
-            "is_leaf": True,
-        }
 
-    return {
-        "token": token_str,
-        "token_hex": token_hex,
-        "rank": rank,
-        "is_leaf": False,
-        "left": get_subtree(ranks, split[0]),
-        "right": get_subtree(ranks, split[1]),
-    }
+def build_forest_index(ranks: dict[bytes, int]) -> ForestIndex:
+    """Build the struct-of-arrays forest index from a ranks dictionary."""
+    token_bytes = list(ranks)
+    n = len(token_bytes)
+    index_by_bytes = {tb: i for i, tb in enumerate(token_bytes)}
 
+    rank_col = np.fromiter(ranks.values(), dtype=np.int64, count=n)
+    byte_lens = np.fromiter(map(len, token_bytes), dtype=np.int32, count=n)
+    left_idx = np.full(n, -1, dtype=np.int32)
+    right_idx = np.full(n, -1, dtype=np.int32)
+    is_root = np.ones(n, dtype=np.bool_)
+
+    for i, tb in enumerate(token_bytes):
+        if len(tb) <= 1:
+            continue
+        split = _find_split(ranks, tb)
+        if split == 0:
+            # No valid split found — treat as leaf
+            continue
+        li = index_by_bytes[tb[:split]]
+        ri = index_by_bytes[tb[split:]]
+        left_idx[i] = li
+        right_idx[i] = ri
+        is_root[li] = False
+        is_root[ri] = False
+
+    leaf_mask = left_idx < 0
+    strs = [tb.decode("utf-8", errors="replace") for tb in token_bytes]
+    lower_strs = [s.lower() for s in strs]
+    hex_strs = [tb.hex() for tb in token_bytes]
+
+    rank_asc = np.argsort(rank_col, kind="stable")
+    len_asc = np.argsort(byte_lens, kind="stable")
+    token_asc = np.array(sorted(range(n), key=strs.__getitem__), dtype=np.intp)
+    sort_orders = {
+        ("rank", "asc"): rank_asc,
+        ("rank", "desc"): rank_asc[::-1],
+        ("byte_length", "asc"): len_asc,
+        ("byte_length", "desc"): len_asc[::-1],
+        ("token", "asc"): token_asc,
+        ("token", "desc"): token_asc[::-1],
+    }
 
-def tree_depth(ranks: dict[bytes, int], token_bytes: bytes) -> int:
-    """Compute the depth of a token's merge tree."""
-    if len(token_bytes) <= 1:
-        return 1
-    split = _find_split(ranks, token_bytes)
-    if split is None:
-        return 1
-    return 1 + max(tree_depth(ranks, split[0]), tree_depth(ranks, split[1]))
+    total_leaves = int(leaf_mask.sum())
+    return ForestIndex(
+        token_bytes=token_bytes,
+        token_strs=strs,
+        lower_strs=lower_strs,
+        hex_strs=hex_strs,
+        ranks=rank_col,
+        byte_lens=byte_lens,
+        left_idx=left_idx,
+        right_idx=right_idx,
+        leaf_mask=leaf_mask,
+        merge_mask=~leaf_mask,
+        root_mask=is_root,
+        sort_orders=sort_orders,
+        rank_to_index={int(r): i for i, r in enumerate(rank_col)},
+        total_leaves=total_leaves,
+        total_merges=n - total_leaves,
+        total_roots=int(is_root.sum()),
+    )
 
 
-def tree_node_count(ranks: dict[bytes, int], token_bytes: bytes) -> int:
-    """Count all nodes in a token's merge tree."""
-    if len(token_bytes) <= 1:
-        return 1
-    split = _find_split(ranks, token_bytes)
-    if split is None:
-        return 1
-    return 1 + tree_node_count(ranks, split[0]) + tree_node_count(ranks, split[1])
+# tokenizer_id -> ForestIndex; bounded, and evicted via evict_cached_index
+# when the registry unloads or reloads a tokenizer
+_forest_cache = LRUCache(maxsize=8)
 
 
-# Module-level cache: tokenizer_id -> list[MergeEntry]
-_forest_cache: dict[str, list[MergeEntry]] = {}
+def get_cached_index(tok_id: str, ranks: dict[bytes, int]) -> ForestIndex:
+    """Get or build the cached forest index for a tokenizer."""
+    index = _forest_cache.get(tok_id)
+    if index is None:
+        index = _forest_cache[tok_id] = build_forest_index(ranks)
+    return index
 
 
-def get_cached_entries(tok_id: str, ranks: dict[bytes, int]) -> list[MergeEntry]:
-    """Get or build cached merge entries for a tokenizer."""
-    if tok_id not in _forest_cache:
-        _forest_cache[tok_id] = build_merge_entries(ranks)
-    return _forest_cache[tok_id]
+def evict_cached_index(tok_id: str) -> None:
+    """Drop a tokenizer's forest index (registry unload/reload hook)."""
+    _forest_cache.pop(tok_id)
@@ -2,8 +2,9 @@
 
 from __future__ import annotations
 
-from dataclasses import dataclass, field
-from typing import List
+import asyncio
+import heapq
+from dataclasses import dataclass
 
 
 @dataclass
@@ -12,48 +13,17 @@ class MergeNode:
     left: MergeNode | None = None
     right: MergeNode | None = None
     rank: int = -1
+    _text: str | None = None
 
     def is_leaf(self) -> bool:
         return self.left is None and self.right is None
 
     def text(self) -> str:
-        return self.token.decode("utf-8", errors="replace")
-
-
-def build_merge_tree(text: str, ranks: dict[bytes, int]) -> list[MergeNode]:
-    """Simulate BPE merges on *text*, returning a forest of merge trees.
-
-    Each root in the returned list is either a leaf (single byte that was
-    never merged) or a binary tree recording the actual BPE merges.
-    No ghost/virtual intermediate nodes are created.
-    """
-    nodes = [MergeNode(bytes([b])) for b in text.encode("utf-8")]
-
-    while len(nodes) > 1:
-        best_rank = float("inf")
-        best_idx = -1
-        best_pair: bytes | None = None
-
-        for i in range(len(nodes) - 1):
-            pair = nodes[i].token + nodes[i + 1].token
-            rank = ranks.get(pair)
-            if rank is not None and rank < best_rank:
-                best_rank = rank
-                best_idx = i
-                best_pair = pair
-
-        if best_pair is None:
-            break
-
-        merged = MergeNode(
-            best_pair,
-            left=nodes[best_idx],
-            right=nodes[best_idx + 1],
-            rank=best_rank,
-        )
-        nodes = nodes[:best_idx] + [merged] + nodes[best_idx + 2:]
-
-    return nodes
+        # Memoized: the same node's text is needed by every step snapshot
+        # it survives into, plus the tree serialization
+        if self._text is None:
+            self._text = self.token.decode("utf-8", errors="replace")
+        return self._text
 
 
 @dataclass
@@ -64,44 +34,103 @@ class MergeStep:
     tokens_after: list[str]
 
 
-def compute_merge_steps(text: str, ranks: dict[bytes, int]) -> list[MergeStep]:
-    """Return the step-by-step merge sequence."""
-    nodes = [MergeNode(bytes([b])) for b in text.encode("utf-8")]
+def _run_merges(
+    text: str, ranks: dict[bytes, int], record_steps: bool = False
+) -> tuple[list[MergeNode], list[MergeStep]]:
+    """Simulate BPE merges, returning the resulting forest and optional steps.
+
+    Nodes live in a doubly linked list over a preallocated array and the
+    next merge comes off a heap of candidate adjacent pairs, so each merge
+    is O(log n) instead of a full rescan of the node list — the standard
+    priority-queue BPE. Stale heap entries (a neighbor has since been
+    merged away) are detected by re-deriving the pair's rank on pop.
+    Output is byte-identical to the previous quadratic scan: lowest rank
+    wins, ties go to the leftmost pair.
+    """
+    data = text.encode("utf-8")
+    n = len(data)
+    nodes = [MergeNode(data[i : i + 1]) for i in range(n)]
     steps: list[MergeStep] = []
+    if n < 2:
+        return nodes, steps
+
+    prev = list(range(-1, n - 1))
+    nxt = list(range(1, n + 1))
+    nxt[-1] = -1
+    alive = [True] * n
+
+    # (rank, index of the pair's left node); the array index of a node is
+    # its original byte offset, so the tuple order reproduces the scan's
+    # leftmost tie-break
+    heap: list[tuple[int, int]] = []
+    for i in range(n - 1):
+        rank = ranks.get(data[i : i + 2])
+        if rank is not None:
+            heap.append((rank, i))
+    heapq.heapify(heap)
+
+    ranks_get = ranks.get
     step_num = 1
+    while heap:
+        rank, i = heapq.heappop(heap)
+        j = nxt[i] if alive[i] else -1
+        if j == -1:
+            continue
+        pair = nodes[i].token + nodes[j].token
+        if ranks_get(pair) != rank:
+            # Stale entry: one of the nodes was merged since the push
+            continue
+
+        merged = MergeNode(pair, left=nodes[i], right=nodes[j], rank=rank)
+        # The merged node takes over the left slot; unlink the right one
+        nodes[i] = merged
+        alive[j] = False
+        nxt[i] = nxt[j]
+        if nxt[j] != -1:
+            prev[nxt[j]] = i
+
+        p = prev[i]
+        if p != -1:
+            new_rank = ranks_get(nodes[p].token + pair)
+            if new_rank is not None:
+                heapq.heappush(heap, (new_rank, p))
+        q = nxt[i]
+        if q != -1:
+            new_rank = ranks_get(pair + nodes[q].token)
+            if new_rank is not None:
+                heapq.heappush(heap, (new_rank, i))
+
+        if record_steps:
+            tokens_after = []
+            k = 0
+            while k != -1:
+                tokens_after.append(nodes[k].text())
+                k = nxt[k]
+            steps.append(MergeStep(
+                step=step_num,
+                merged_token=merged.text(),
+                rank=rank,
+                tokens_after=tokens_after,
+            ))
+            step_num += 1
+
+    return [nodes[k] for k in range(n) if alive[k]], steps
 
-    while len(nodes) > 1:
-        best_rank = float("inf")
-        best_idx = -1
-        best_pair: bytes | None = None
-
-        for i in range(len(nodes) - 1):
-            pair = nodes[i].token + nodes[i + 1].token
-            rank = ranks.get(pair)
-            if rank is not None and rank < best_rank:
-                best_rank = rank
-                best_idx = i
-                best_pair = pair
-
-        if best_pair is None:
-            break
-
-        merged = MergeNode(
-            best_pair,
-            left=nodes[best_idx],
-            right=nodes[best_idx + 1],
-            rank=best_rank,
-        )
-        nodes = nodes[:best_idx] + [merged] + nodes[best_idx + 2:]
-
-        steps.append(MergeStep(
-            step=step_num,
-            merged_token=best_pair.decode("utf-8", errors="replace"),
-            rank=best_rank,
-            tokens_after=[n.text() for n in nodes],
-        ))
-        step_num += 1
 
+def build_merge_tree(text: str, ranks: dict[bytes, int]) -> list[MergeNode]:
+    """Simulate BPE merges on *text*, returning a forest of merge trees.
+
+    Each root in the returned list is either a leaf (single byte that was
+    never merged) or a binary tree recording the actual BPE merges.
+    No ghost/virtual intermediate nodes are created.
+    """
+    forest, _ = _run_merges(text, ranks)
+    return forest
+
+
+def compute_merge_steps(text: str, ranks: dict[bytes, int]) -> list[MergeStep]:
+    """Return the step-by-step merge sequence."""
+    _, steps = _run_merges(text, ranks, record_steps=True)
     return steps
 
 
@@ -118,79 +147,79 @@ def node_to_dict(node: MergeNode) -> dict:
     return result
 
 
-def collect_intermediates_from_node(node: MergeNode, acc: set[str]) -> None:
-    """Collect all intermediate (non-leaf) token strings from a single tree."""
-    if not node.is_leaf():
-        acc.add(node.text())
+def collect_intermediates(forest: list[MergeNode]) -> set[str]:
+    """Collect all intermediate (non-leaf) token strings from a forest.
+
+    Iterative walk to avoid a Python frame per node; dedup happens on the
+    raw bytes so each distinct intermediate is decoded exactly once.
+    """
+    acc: set[bytes] = set()
+    stack = list(forest)
+    while stack:
+        node = stack.pop()
+        if node.is_leaf():
+            continue
+        acc.add(node.token)
         if node.left is not None:
-            collect_intermediates_from_node(node.left, acc)
+            stack.append(node.left)
         if node.right is not None:
-            collect_intermediates_from_node(node.right, acc)
-
-
-def collect_intermediates(forest: list[MergeNode]) -> set[str]:
-    """Collect all intermediate (non-leaf) token strings from a forest."""
-    acc: set[str] = set()
-    for node in forest:
-        collect_intermediates_from_node(node, acc)
-    return acc
+            stack.append(node.right)
+    return {b.decode("utf-8", errors="replace") for b in acc}
+
+
+def _tokenizer_payload(
+    text: str, ranks: dict[bytes, int], name: str, initial_bytes: list[str]
+) -> tuple[dict, set[str]]:
+    """One tokenizer's side of the comparison: payload dict + intermediates."""
+    # One merge simulation yields both the forest and the steps
+    forest, steps = _run_merges(text, ranks, record_steps=True)
+    payload = {
+        "name": name,
+        "trees": [node_to_dict(n) for n in forest],
+        "steps": [
+            {
+                "step": s.step,
+                "merged_token": s.merged_token,
+                "rank": s.rank,
+                "tokens_after": s.tokens_after,
+            }
+            for s in steps
+        ],
+        "final_tokens": [n for n in (steps[-1].tokens_after if steps else initial_bytes)],
+    }
+    return payload, collect_intermediates(forest)
 
 
-def compare_merge_trees(
+async def compare_merge_trees(
     text: str,
     ranks_a: dict[bytes, int],
     ranks_b: dict[bytes, int],
     name_a: str,
     name_b: str,
 ) -> dict:
-    """Build merge trees for both tokenizers and compute conflict analysis."""
-    tree_a = build_merge_tree(text, ranks_a)
-    tree_b = build_merge_tree(text, ranks_b)
+    """Build merge trees for both tokenizers and compute conflict analysis.
 
-    steps_a = compute_merge_steps(text, ranks_a)
-    steps_b = compute_merge_steps(text, ranks_b)
+    The two simulations are independent, so each runs on its own worker
+    thread (same gather-over-to_thread shape as comparison.compute_overlap),
+    keeping the event loop free while they build.
+    """
+    initial_bytes = [chr(b) if 32 <= b < 127 else f"0x{b:02x}"
+                     for b in text.encode("utf-8")]
 
-    ints_a = collect_intermediates(tree_a)
-    ints_b = collect_intermediates(tree_b)
+    (payload_a, ints_a), (payload_b, ints_b) = await asyncio.gather(
+        asyncio.to_thread(_tokenizer_payload, text, ranks_a, name_a, initial_bytes),
+        asyncio.to_thread(_tokenizer_payload, text, ranks_b, name_b, initial_bytes),
+    )
 
     shared = sorted(ints_a & ints_b)
     only_a = sorted(ints_a - ints_b)
     only_b = sorted(ints_b - ints_a)
 
-    initial_bytes = [chr(b) if 32 <= b < 127 else f"0x{b:02x}"
-                     for b in text.encode("utf-8")]
-
     return {
         "text": text,
         "initial_bytes": initial_bytes,
-        "tokenizer_a": {
-            "name": name_a,
-            "trees": [node_to_dict(n) for n in tree_a],
-            "steps": [
-                {
-                    "step": s.step,
-                    "merged_token": s.merged_token,
-                    "rank": s.rank,
-                    "tokens_after": s.tokens_after,
-                }
-                for s in steps_a
-            ],
-            "final_tokens": [n for n in (steps_a[-1].tokens_after if steps_a else initial_bytes)],
-        },
-        "tokenizer_b": {
-            "name": name_b,
-            "trees": [node_to_dict(n) for n in tree_b],
-            "steps": [
-                {
-                    "step": s.step,
-                    "merged_token": s.merged_token,
-                    "rank": s.rank,
-                    "tokens_after": s.tokens_after,
-                }
-                for s in steps_b
-            ],
-            "final_tokens": [n for n in (steps_b[-1].tokens_after if steps_b else initial_bytes)],
-        },
+        "tokenizer_a": payload_a,
+        "tokenizer_b": payload_b,
         "conflict_analysis": {
             "shared_intermediates": shared,
             "only_a": only_a,
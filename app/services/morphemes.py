@@ -1,4 +1,9 @@
+from dataclasses import dataclass
+
+import numpy as np
+
 from app.services.adapter import TokenizerAdapter
+from app.services.vocab_view import get_vocab_view
 
 # Common English morphemes
 PREFIXES = [
@@ -45,6 +50,29 @@ ROOTS = [
 ALL_MORPHEMES = set(PREFIXES + SUFFIXES + ROOTS)
 
 
+def _build_morpheme_trie() -> dict:
+    """Character trie over ALL_MORPHEMES; terminal nodes store the length.
+
+    One walk from a position yields the longest morpheme starting there,
+    replacing the length-descending dict probes (ten slice+hash attempts
+    per position) with a single pointer chase per character.
+    """
+    root: dict = {}
+    for morpheme in ALL_MORPHEMES:
+        node = root
+        for ch in morpheme:
+            node = node.setdefault(ch, {})
+        node[""] = len(morpheme)
+    return root
+
+
+_MORPHEME_TRIE = _build_morpheme_trie()
+_MIN_MORPH = min(len(m) for m in ALL_MORPHEMES)
+# First characters of any morpheme (== the trie's root keys); a word
+# containing none of them cannot match anything
+_FIRST_CHARS = frozenset(_MORPHEME_TRIE)
+
+
 def _decompose_morphemes(word: str) -> tuple[str, list[str]]:
     """
     Attempt to decompose a word into known morphemes.
@@ -55,30 +83,42 @@ def _decompose_morphemes(word: str) -> tuple[str, list[str]]:
 
     word_lower = word.lower()
 
+    # Most vocabulary tokens are non-morphological: too short to contain
+    # any morpheme, or sharing no character with a morpheme start
+    if len(word_lower) < _MIN_MORPH or _FIRST_CHARS.isdisjoint(word_lower):
+        return ("arbitrary", [])
+
     # Exact match
     if word_lower in ALL_MORPHEMES:
         return ("morpheme", [word_lower])
 
-    # Try to decompose via longest-match greedy
+    # Try to decompose via longest-match greedy, walking the trie once per
+    # position and remembering the deepest terminal passed
     morphemes = []
-    remaining = word_lower
     unmatched = 0
-
-    while remaining:
-        best_match = ""
-        for length in range(min(len(remaining), 10), 0, -1):
-            candidate = remaining[:length]
-            if candidate in ALL_MORPHEMES:
-                best_match = candidate
+    pos = 0
+    n = len(word_lower)
+
+    while pos < n:
+        node = _MORPHEME_TRIE
+        best_len = 0
+        j = pos
+        while j < n:
+            node = node.get(word_lower[j])
+            if node is None:
                 break
-
-        if best_match:
-            morphemes.append(best_match)
-            remaining = remaining[len(best_match):]
+            j += 1
+            terminal_len = node.get("")
+            if terminal_len:
+                best_len = terminal_len
+
+        if best_len:
+            morphemes.append(word_lower[pos : pos + best_len])
+            pos += best_len
         else:
             # No morpheme match, consume one character
             unmatched += 1
-            remaining = remaining[1:]
+            pos += 1
 
     if unmatched == 0 and len(morphemes) > 1:
         return ("morpheme_composite", morphemes)
@@ -88,23 +128,68 @@ def _decompose_morphemes(word: str) -> tuple[str, list[str]]:
         return ("arbitrary", [])
 
 
-def compute_morpheme_analysis(adapter: TokenizerAdapter) -> list[dict]:
+MORPHEME_TYPES = ["morpheme", "morpheme_composite", "subword", "arbitrary"]
+_TYPE_CODES = {t: i for i, t in enumerate(MORPHEME_TYPES)}
+
+
+@dataclass
+class MorphemeTable:
+    """Column-oriented morpheme analysis for a whole vocabulary.
+
+    Parallel arrays instead of a list of per-token dicts: numeric columns are
+    a few bytes per token rather than a ~200-byte dict, and type filtering is
+    a C-level array compare.
+    """
+
+    token_strs: list[str]
+    token_ids: np.ndarray  # int32[N]
+    type_codes: np.ndarray  # int8[N], index into MORPHEME_TYPES
+    morphemes: list[list[str]]
+    type_dist: dict[str, int]
+
+    def __len__(self) -> int:
+        return len(self.token_strs)
+
+    def indices_for_type(self, morpheme_type: str) -> np.ndarray:
+        code = _TYPE_CODES.get(morpheme_type, -1)
+        return np.flatnonzero(self.type_codes == code)
+
+    def row(self, i: int) -> dict:
+        return {
+            "token_str": self.token_strs[i],
+            "token_id": int(self.token_ids[i]),
+            "morpheme_type": MORPHEME_TYPES[self.type_codes[i]],
+            "morphemes": self.morphemes[i],
+        }
+
+    def rows(self, indices) -> list[dict]:
+        return [self.row(i) for i in indices]
+
+
+def compute_morpheme_analysis(adapter: TokenizerAdapter) -> MorphemeTable:
     """Analyze morphological structure of all vocabulary tokens."""
-    vocab = adapter.get_vocab()
-    results = []
-
-    for token_str, token_id in vocab.items():
-        # Strip space prefix for analysis
-        clean = token_str.lstrip(" \u0120\u00a0▁")
-        morpheme_type, morphemes = _decompose_morphemes(clean)
-
-        results.append(
-            {
-                "token_str": token_str,
-                "token_id": token_id,
-                "morpheme_type": morpheme_type,
-                "morphemes": morphemes,
-            }
-        )
-
-    return results
+    view = get_vocab_view(adapter)
+    n = len(view)
+    type_codes = np.empty(n, dtype=np.int8)
+    morphemes: list[list[str]] = []
+
+    # Space-prefix variants collapse onto the same clean form, so decompose
+    # each unique clean string once and broadcast the result
+    decomp_cache: dict[str, tuple[int, list[str]]] = {}
+    for i, clean in enumerate(view.clean_strs):
+        cached = decomp_cache.get(clean)
+        if cached is None:
+            morpheme_type, parts = _decompose_morphemes(clean)
+            cached = decomp_cache[clean] = (_TYPE_CODES[morpheme_type], parts)
+        type_codes[i] = cached[0]
+        morphemes.append(cached[1])
+
+    counts = np.bincount(type_codes, minlength=len(MORPHEME_TYPES))
+    type_dist = {t: int(c) for t, c in zip(MORPHEME_TYPES, counts) if c}
+    return MorphemeTable(
+        token_strs=view.token_strs,
+        token_ids=view.token_ids,
+        type_codes=type_codes,
+        morphemes=morphemes,
+        type_dist=type_dist,
+    )
@@ -1,18 +1,31 @@
 import re
 import unicodedata
+from dataclasses import dataclass
+
+import numpy as np
 
 from app.services.adapter import TokenizerAdapter
+from app.services.tokstr import has_space_prefix
+from app.services.vocab_view import get_vocab_view
+
 
+_NON_WORD_RE = re.compile(r"[^\w]", flags=re.UNICODE)
+# ASCII fast path: delete-table equivalent of the regex for ASCII strings,
+# where \w is exactly [a-zA-Z0-9_]
+_ASCII_NON_WORD_TRANS = str.maketrans(
+    "", "", "".join(chr(i) for i in range(128) if not (chr(i).isalnum() or chr(i) == "_"))
+)
 
-def _normalize(token: str) -> str:
-    """Normalize a token to its base form for grouping."""
-    # Strip leading space markers (Ġ = U+0120, or actual space/NBSP)
-    s = token.lstrip(" \u0120\u00a0")
+
+def _normalize_clean(clean: str) -> str:
+    """Normalize an already space-stripped token for grouping."""
     # Lowercase
-    s = s.lower()
-    # Strip punctuation
-    s = re.sub(r"[^\w]", "", s, flags=re.UNICODE)
-    return s
+    s = clean.lower()
+    # Strip punctuation; most BPE tokens are ASCII and take the C-level
+    # translate instead of the regex
+    if s.isascii():
+        return s.translate(_ASCII_NON_WORD_TRANS)
+    return _NON_WORD_RE.sub("", s)
 
 
 def _detect_casing(token: str) -> str:
@@ -33,55 +46,112 @@ def _has_punctuation(token: str) -> bool:
     return any(unicodedata.category(c).startswith("P") for c in token)
 
 
-def _has_space_prefix(token: str) -> bool:
-    return token.startswith((" ", "\u0120", "\u00a0", "▁"))
+CASINGS = ["lower", "upper", "title", "mixed"]
+_CASING_CODES = {c: i for i, c in enumerate(CASINGS)}
+
+
+@dataclass
+class MultiplicityTable:
+    """Column-oriented multiplicity groups in CSR layout.
+
+    Groups are stored as a flat variant table plus an offsets array:
+    group ``i`` owns variants ``offsets[i]:offsets[i + 1]``. Numeric and
+    boolean columns are a few bytes per variant instead of a per-variant
+    dict; only the groups on the current page become dicts.
+    """
+
+    base_forms: list[str]  # one per group, sorted by size desc
+    offsets: np.ndarray  # int32[G + 1], variant span per group
+    token_ids: np.ndarray  # int32[M]
+    token_strs: list[str]  # one per variant
+    space_prefix: np.ndarray  # bool[M]
+    casing_codes: np.ndarray  # int8[M], index into CASINGS
+    punctuation: np.ndarray  # bool[M]
+
+    def __len__(self) -> int:
+        return len(self.base_forms)
+
+    def group(self, i: int) -> dict:
+        start, end = int(self.offsets[i]), int(self.offsets[i + 1])
+        variants = [
+            {
+                "token_id": int(self.token_ids[j]),
+                "token_str": self.token_strs[j],
+                "has_space_prefix": bool(self.space_prefix[j]),
+                "casing": CASINGS[self.casing_codes[j]],
+                "has_punctuation": bool(self.punctuation[j]),
+            }
+            for j in range(start, end)
+        ]
+        return {
+            "base_form": self.base_forms[i],
+            "variants": variants,
+            "count": end - start,
+        }
+
+    def groups(self, indices) -> list[dict]:
+        return [self.group(i) for i in indices]
 
 
 def compute_multiplicity_groups(
     adapter: TokenizerAdapter,
-) -> list[dict]:
+) -> MultiplicityTable:
     """Compute all multiplicity groups for a tokenizer's vocabulary."""
-    vocab = adapter.get_vocab()
-    groups: dict[str, list[dict]] = {}
+    view = get_vocab_view(adapter)
+    groups: dict[str, list[tuple[str, int]]] = {}
 
-    for token_str, token_id in vocab.items():
-        base = _normalize(token_str)
+    for token_str, clean, token_id in zip(
+        view.token_strs, view.clean_strs, view.token_ids.tolist()
+    ):
+        base = _normalize_clean(clean)
         if not base or len(base) < 1:
             continue
-
-        variant = {
-            "token_id": token_id,
-            "token_str": token_str,
-            "has_space_prefix": _has_space_prefix(token_str),
-            "casing": _detect_casing(token_str),
-            "has_punctuation": _has_punctuation(token_str),
-        }
-
         if base not in groups:
             groups[base] = []
-        groups[base].append(variant)
-
-    # Only keep groups with more than one variant
-    result = []
-    for base_form, variants in groups.items():
-        if len(variants) > 1:
-            result.append(
-                {
-                    "base_form": base_form,
-                    "variants": variants,
-                    "count": len(variants),
-                }
-            )
-
-    # Sort by group size (most variants first)
-    result.sort(key=lambda g: g["count"], reverse=True)
-    return result
-
-
-def search_multiplicity_groups(
-    adapter: TokenizerAdapter, query: str
-) -> list[dict]:
-    """Search for multiplicity groups matching a query."""
-    all_groups = compute_multiplicity_groups(adapter)
+        groups[base].append((token_str, token_id))
+
+    # Only keep groups with more than one variant; largest first
+    kept = sorted(
+        ((base, variants) for base, variants in groups.items() if len(variants) > 1),
+        key=lambda g: len(g[1]),
+        reverse=True,
+    )
+
+    n_groups = len(kept)
+    n_variants = sum(len(v) for _, v in kept)
+    base_forms: list[str] = []
+    offsets = np.empty(n_groups + 1, dtype=np.int32)
+    offsets[0] = 0
+    token_ids = np.empty(n_variants, dtype=np.int32)
+    token_strs: list[str] = []
+    space_prefix = np.empty(n_variants, dtype=np.bool_)
+    casing_codes = np.empty(n_variants, dtype=np.int8)
+    punctuation = np.empty(n_variants, dtype=np.bool_)
+
+    j = 0
+    for i, (base, variants) in enumerate(kept):
+        base_forms.append(base)
+        for token_str, token_id in variants:
+            token_ids[j] = token_id
+            token_strs.append(token_str)
+            space_prefix[j] = has_space_prefix(token_str)
+            casing_codes[j] = _CASING_CODES[_detect_casing(token_str)]
+            punctuation[j] = _has_punctuation(token_str)
+            j += 1
+        offsets[i + 1] = j
+
+    return MultiplicityTable(
+        base_forms=base_forms,
+        offsets=offsets,
+        token_ids=token_ids,
+        token_strs=token_strs,
+        space_prefix=space_prefix,
+        casing_codes=casing_codes,
+        punctuation=punctuation,
+    )
+
+
+def search_multiplicity_groups(table: MultiplicityTable, query: str) -> list[int]:
+    """Return indices of groups whose base form matches a query."""
     query_lower = query.lower().strip()
-    return [g for g in all_groups if query_lower in g["base_form"]]
+    return [i for i, base in enumerate(table.base_forms) if query_lower in base]
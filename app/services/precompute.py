@@ -0,0 +1,67 @@
+"""Background precomputation of full-vocabulary analyses.
+
+compute_morpheme_analysis, compute_multiplicity_groups, and
+detect_undertrained_tokens each hold a CPU for seconds on a 100k+-token
+vocabulary, and their results are deterministic per tokenizer. The
+registry queues all three on a small worker pool as soon as an adapter
+loads, so by the time an endpoint needs a table it is usually already
+built; a cold endpoint hit submits the same task itself, and concurrent
+hits for one (tokenizer, analysis) pair share a single future.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable
+
+from app.services.adapter import TokenizerAdapter
+from app.services.morphemes import compute_morpheme_analysis
+from app.services.multiplicity import compute_multiplicity_groups
+from app.services.undertrained import detect_undertrained_tokens
+
+_ANALYSES: dict[str, Callable[[TokenizerAdapter], object]] = {
+    "morphemes": compute_morpheme_analysis,
+    "multiplicity": compute_multiplicity_groups,
+    "undertrained": detect_undertrained_tokens,
+}
+
+# Two workers keep one long analysis from serializing the whole preload
+# while still staying off the request threads
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="precompute")
+_lock = threading.Lock()
+_futures: dict[tuple[str, str], Future] = {}
+
+
+def submit_all(name: str, adapter: TokenizerAdapter) -> None:
+    """Queue every analysis for a freshly loaded adapter."""
+    with _lock:
+        for kind, fn in _ANALYSES.items():
+            key = (name, kind)
+            if key not in _futures:
+                _futures[key] = _executor.submit(fn, adapter)
+
+
+def evict(name: str) -> None:
+    """Drop (and cancel, if still queued) an evicted adapter's futures."""
+    with _lock:
+        for key in [k for k in _futures if k[0] == name]:
+            _futures.pop(key).cancel()
+
+
+async def result(name: str, adapter: TokenizerAdapter, kind: str):
+    """Await an analysis table, submitting the task first on a cold hit."""
+    key = (name, kind)
+    with _lock:
+        future = _futures.get(key)
+        if future is None or future.cancelled():
+            future = _futures[key] = _executor.submit(_ANALYSES[kind], adapter)
+    try:
+        return await asyncio.wrap_future(future)
+    except Exception:
+        # Leave failed runs out of the table so a later hit retries
+        with _lock:
+            if _futures.get(key) is future:
+                del _futures[key]
+        raise
@@ -1,6 +1,9 @@
 import os
+import threading
 from collections import OrderedDict
+from typing import Callable
 
+from app.services import precompute
 from app.services.adapter import (
     HuggingFaceAdapter,
     SentencePieceAdapter,
@@ -38,17 +41,68 @@ class TokenizerRegistry:
     def __init__(self, max_cache_size: int = 10):
         self._cache: OrderedDict[str, TokenizerAdapter] = OrderedDict()
         self._max_cache_size = max_cache_size
+        # Bumped whenever the set of loaded tokenizers changes, so callers
+        # can cache list responses and invalidate by comparing versions
+        self.list_version = 0
+        # Called with the tokenizer id whenever an adapter leaves the cache,
+        # so downstream analysis caches can drop their derived results
+        self._unload_callbacks: list[Callable[[str], None]] = []
+        # Endpoints run in the server's thread pool, so cache mutations need
+        # a lock; per-name events stop concurrent requests from loading the
+        # same multi-hundred-MB model twice
+        self._lock = threading.Lock()
+        self._loading: dict[str, threading.Event] = {}
+
+    def on_unload(self, callback: Callable[[str], None]) -> None:
+        """Register a callback invoked when a tokenizer is evicted."""
+        self._unload_callbacks.append(callback)
+
+    def _notify_unload(self, name: str) -> None:
+        precompute.evict(name)
+        for callback in self._unload_callbacks:
+            callback(name)
 
     def load(self, name: str) -> TokenizerAdapter:
-        """Load a tokenizer by name, HuggingFace model ID, or file path."""
-        if name in self._cache:
-            self._cache.move_to_end(name)
-            return self._cache[name]
-
-        adapter = self._create_adapter(name)
-        self._cache[name] = adapter
-        if len(self._cache) > self._max_cache_size:
-            self._cache.popitem(last=False)
+        """Load a tokenizer by name, HuggingFace model ID, or file path.
+
+        Concurrent loads of the same name wait for the first caller's
+        result instead of constructing a duplicate adapter.
+        """
+        while True:
+            with self._lock:
+                adapter = self._cache.get(name)
+                if adapter is not None:
+                    self._cache.move_to_end(name)
+                    return adapter
+                event = self._loading.get(name)
+                if event is None:
+                    event = self._loading[name] = threading.Event()
+                    break
+            # Another request is loading this tokenizer; wait and re-check
+            # (a failed load leaves the cache empty and we retry ourselves)
+            event.wait()
+
+        try:
+            adapter = self._create_adapter(name)
+        except BaseException:
+            with self._lock:
+                del self._loading[name]
+            event.set()
+            raise
+
+        evicted = None
+        with self._lock:
+            self._cache[name] = adapter
+            if len(self._cache) > self._max_cache_size:
+                evicted, _ = self._cache.popitem(last=False)
+            self.list_version += 1
+            del self._loading[name]
+        event.set()
+        if evicted is not None:
+            self._notify_unload(evicted)
+        # Kick off the full-vocab analyses in the background so their
+        # endpoints usually find a finished table
+        precompute.submit_all(name, adapter)
         return adapter
 
     def _create_adapter(self, name: str) -> TokenizerAdapter:
@@ -77,15 +131,35 @@ class TokenizerRegistry:
 
     def reload(self, name: str) -> TokenizerAdapter:
         """Evict a tokenizer from cache and reload it fresh."""
-        self._cache.pop(name, None)
+        with self._lock:
+            evicted = self._cache.pop(name, None) is not None
+        if evicted:
+            self._notify_unload(name)
         return self.load(name)
 
     def get(self, name: str) -> TokenizerAdapter | None:
         """Get a cached tokenizer, or None if not loaded."""
-        if name in self._cache:
-            self._cache.move_to_end(name)
-            return self._cache[name]
-        return None
+        with self._lock:
+            adapter = self._cache.get(name)
+            if adapter is not None:
+                self._cache.move_to_end(name)
+            return adapter
+
+    def get_many(self, names: list[str]) -> dict[str, TokenizerAdapter]:
+        """Get several cached tokenizers in one pass, preserving order.
+
+        Raises KeyError with the first missing name so callers can map it
+        to their own error response.
+        """
+        adapters: dict[str, TokenizerAdapter] = {}
+        with self._lock:
+            for name in names:
+                adapter = self._cache.get(name)
+                if adapter is None:
+                    raise KeyError(name)
+                self._cache.move_to_end(name)
+                adapters[name] = adapter
+        return adapters
 
     def list_loaded(self) -> list[dict]:
         """List all currently loaded tokenizers."""
@@ -0,0 +1,152 @@
+"""Vectorized Unicode script classification for vocabulary-wide scans.
+
+``unicodedata.category``/``unicodedata.name`` per character across a
+50k-200k token vocabulary is pure-Python compute. Instead, classify every
+code point below ``_TABLE_SIZE`` once into a numpy lookup table, then map
+a whole vocabulary with a single ``utf-32`` decode and one array gather.
+
+Two labelling schemes are kept because the routers expose different
+category names: ``"language"`` matches the composition endpoint
+(aliased script names, Symbol/Whitespace/Control split) and ``"vocab"``
+matches the vocab stats endpoint (raw script names, merged categories).
+"""
+
+from __future__ import annotations
+
+import unicodedata
+
+import numpy as np
+
+# Map Unicode script names to readable categories
+SCRIPT_ALIASES = {
+    "LATIN": "Latin",
+    "CJK": "CJK",
+    "HANGUL": "Korean",
+    "HIRAGANA": "Japanese (Hiragana)",
+    "KATAKANA": "Japanese (Katakana)",
+    "ARABIC": "Arabic",
+    "DEVANAGARI": "Devanagari",
+    "CYRILLIC": "Cyrillic",
+    "GREEK": "Greek",
+    "HEBREW": "Hebrew",
+    "THAI": "Thai",
+    "GEORGIAN": "Georgian",
+    "ARMENIAN": "Armenian",
+    "BENGALI": "Bengali",
+    "TAMIL": "Tamil",
+    "TELUGU": "Telugu",
+    "KANNADA": "Kannada",
+    "MALAYALAM": "Malayalam",
+    "GUJARATI": "Gujarati",
+    "GURMUKHI": "Gurmukhi",
+    "ETHIOPIC": "Ethiopic",
+    "TIBETAN": "Tibetan",
+    "MYANMAR": "Myanmar",
+    "KHMER": "Khmer",
+    "LAO": "Lao",
+    "SINHALA": "Sinhala",
+}
+
+# Covers the BMP plus the SMP scripts; anything above is classified lazily
+_TABLE_SIZE = 0x30000
+
+
+# Major-category prefix -> label, for the non-letter cases of each scheme
+_LANGUAGE_CATEGORIES = {
+    "N": "Digit",
+    "P": "Punctuation",
+    "S": "Symbol",
+    "Z": "Whitespace",
+    "C": "Control",
+}
+_VOCAB_CATEGORIES = {
+    "N": "Digit",
+    "P": "Punctuation",
+    "S": "Punctuation",
+    "Z": "Control/Space",
+    "C": "Control/Space",
+}
+
+
+def _language_label(ch: str) -> str:
+    """Script category of a character, language-composition scheme."""
+    cat = unicodedata.category(ch)
+    if cat[0] in "LM":
+        name = unicodedata.name(ch, "UNKNOWN")
+        first_word = name.split(" ")[0]
+        return SCRIPT_ALIASES.get(first_word, first_word.title())
+    return _LANGUAGE_CATEGORIES.get(cat[0], "Other")
+
+
+def _vocab_label(ch: str) -> str:
+    """Script category of a character, vocab-stats scheme."""
+    cat = unicodedata.category(ch)
+    if cat[0] == "L":
+        return unicodedata.name(ch, "").split(" ")[0]
+    return _VOCAB_CATEGORIES.get(cat[0], "Other")
+
+
+_LABEL_FNS = {"language": _language_label, "vocab": _vocab_label}
+# scheme -> (code point -> code table, code -> name list, name -> code dict)
+_tables: dict[str, tuple[np.ndarray, list[str], dict[str, int]]] = {}
+
+
+def _get_table(scheme: str) -> tuple[np.ndarray, list[str], dict[str, int]]:
+    if scheme not in _tables:
+        label_fn = _LABEL_FNS[scheme]
+        names: list[str] = []
+        codes_by_name: dict[str, int] = {}
+        table = np.empty(_TABLE_SIZE, dtype=np.uint16)
+        for cp in range(_TABLE_SIZE):
+            label = label_fn(chr(cp))
+            code = codes_by_name.get(label)
+            if code is None:
+                code = codes_by_name[label] = len(names)
+                names.append(label)
+            table[cp] = code
+        _tables[scheme] = (table, names, codes_by_name)
+    return _tables[scheme]
+
+
+def token_script_codes(
+    tokens: list[str], scheme: str
+) -> tuple[list[list[int]], list[str]]:
+    """Classify every character of every token in one vectorized pass.
+
+    Returns a per-token list of script codes plus the code -> name lookup.
+    """
+    table, names, codes_by_name = _get_table(scheme)
+    joined = "".join(tokens)
+    cps = np.frombuffer(joined.encode("utf-32-le", "surrogatepass"), dtype=np.uint32)
+    in_range = cps < _TABLE_SIZE
+    codes = table[np.where(in_range, cps, 0)].astype(np.int32)
+
+    if not in_range.all():
+        # Rare astral-plane characters: classify individually and intern
+        label_fn = _LABEL_FNS[scheme]
+        for i in np.flatnonzero(~in_range).tolist():
+            label = label_fn(chr(int(cps[i])))
+            code = codes_by_name.get(label)
+            if code is None:
+                code = codes_by_name[label] = len(names)
+                names.append(label)
+            codes[i] = code
+
+    codes_list = codes.tolist()
+    out: list[list[int]] = []
+    pos = 0
+    for token in tokens:
+        end = pos + len(token)
+        out.append(codes_list[pos:end])
+        pos = end
+    return out, names
+
+
+def dominant_script(codes: list[int], names: list[str]) -> str:
+    """Most frequent script in a token, first-seen winning ties."""
+    if not codes:
+        return "Empty"
+    counts: dict[int, int] = {}
+    for c in codes:
+        counts[c] = counts.get(c, 0) + 1
+    return names[max(counts, key=counts.get)]
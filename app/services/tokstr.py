@@ -0,0 +1,19 @@
+"""Shared handling of leading space markers on vocabulary tokens.
+
+BPE and SentencePiece vocabularies mark a leading space with Ġ (U+0120),
+NBSP, or ▁ (U+2581); the analysis services all need to strip or detect
+these, and previously each kept its own slightly different character set.
+"""
+
+SPACE_PREFIX_CHARS = " Ġ ▁"
+SPACE_PREFIX_TUPLE = tuple(SPACE_PREFIX_CHARS)
+
+
+def strip_space_prefix(token: str) -> str:
+    """Strip leading space markers from a vocabulary token."""
+    return token.lstrip(SPACE_PREFIX_CHARS)
+
+
+def has_space_prefix(token: str) -> bool:
+    """Whether a vocabulary token starts with a space marker."""
+    return token.startswith(SPACE_PREFIX_TUPLE)
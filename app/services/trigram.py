@@ -0,0 +1,54 @@
+"""Trigram inverted index for narrowing substring searches.
+
+Shared by the vocabulary and merge-forest indexes, which each keep one
+of these lazily over their string columns: a substring query becomes an
+intersection of trigram postings, leaving only a small candidate set
+for the final substring check.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+
+
+class TrigramIndex:
+    """Maps character trigrams to sorted indices of the strings containing them."""
+
+    __slots__ = ("_postings",)
+
+    def __init__(self, *columns: list[str]):
+        """Build postings over one or more parallel string columns.
+
+        An entry index appears in a trigram's posting if any of its
+        column strings contains that trigram.
+        """
+        postings: dict[str, list[int]] = {}
+        for strs in columns:
+            for i, s in enumerate(strs):
+                for j in range(len(s) - 2):
+                    postings.setdefault(s[j : j + 3], []).append(i)
+        self._postings = {
+            g: np.unique(np.array(idx, dtype=np.intp)) for g, idx in postings.items()
+        }
+
+    def candidates(self, query: str) -> np.ndarray | None:
+        """Sorted candidate indices for a substring query.
+
+        Returns None when the query is too short for the index (callers
+        fall back to a full scan); the returned candidates still need the
+        final substring check.
+        """
+        if len(query) < 3:
+            return None
+        candidates: np.ndarray | None = None
+        for j in range(len(query) - 2):
+            posting = self._postings.get(query[j : j + 3])
+            if posting is None:
+                return np.empty(0, dtype=np.intp)
+            if candidates is None:
+                candidates = posting
+            else:
+                candidates = np.intersect1d(candidates, posting, assume_unique=True)
+            if candidates.size == 0:
+                break
+        return candidates
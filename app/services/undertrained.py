@@ -1,62 +1,145 @@
+import heapq
 import unicodedata
+from dataclasses import dataclass
+
+import numpy as np
 
 from app.services.adapter import TokenizerAdapter
+from app.services.vocab_view import get_vocab_view
+
+
+@dataclass
+class UndertrainedTable:
+    """Column-oriented undertrained-token results, sorted by confidence desc.
+
+    Numeric columns live in numpy arrays; per-token dicts are built only
+    for the rows a caller actually pages over.
+    """
+
+    token_ids: np.ndarray  # int32[N]
+    token_strs: list[str]
+    token_hexes: list[str]
+    reasons: list[str]
+    confidences: np.ndarray  # float32[N]
+    merge_results: list[list[str]]
+
+    def __len__(self) -> int:
+        return len(self.token_strs)
+
+    def row(self, i: int) -> dict:
+        return {
+            "token_id": int(self.token_ids[i]),
+            "token_str": self.token_strs[i],
+            "token_bytes_hex": self.token_hexes[i],
+            "reason": self.reasons[i],
+            "confidence": round(float(self.confidences[i]), 2),
+            "expected_merge_path": [self.token_strs[i]],
+            "actual_merge_result": self.merge_results[i],
+        }
+
+    def rows(self, indices) -> list[dict]:
+        return [self.row(i) for i in indices]
+
+
+# Maps control bytes other than common whitespace (tab/LF/CR), plus DEL,
+# to 0xFF and everything else to 0x00; a token has an unusual byte iff
+# 0xFF appears in its translation. Both translate and the containment
+# scan run at C speed.
+_UNUSUAL_TBL = bytes(
+    0xFF if (b < 0x20 and b not in (0x09, 0x0A, 0x0D)) or b == 0x7F else 0x00
+    for b in range(256)
+)
 
 
 def _has_unusual_bytes(token_bytes: bytes) -> bool:
-    """Check if token contains unusual byte sequences."""
-    for b in token_bytes:
-        # Control characters (except common whitespace)
-        if b < 0x20 and b not in (0x09, 0x0A, 0x0D):
-            return True
-        # DEL character
-        if b == 0x7F:
-            return True
-    # Check for incomplete UTF-8 sequences
-    try:
-        token_bytes.decode("utf-8")
-    except UnicodeDecodeError:
-        return True
-    return False
+    """Whether a token contains control bytes other than tab/LF/CR."""
+    return b"\xff" in token_bytes.translate(_UNUSUAL_TBL)
 
 
 def _simulate_bpe(
     token_bytes: bytes,
-    merge_ranks: dict[tuple[bytes, bytes], int],
-    byte_to_rank: dict[bytes, int],
+    merge_ranks: dict[int, int],
+    piece_ids: dict[bytes, int],
 ) -> list[bytes]:
     """
     Simulate BPE encoding of a byte sequence using the given merge rules.
     Returns the list of token pieces after all applicable merges.
-    """
-    # Start with individual bytes
-    pieces = [bytes([b]) for b in token_bytes]
-
-    while len(pieces) > 1:
-        # Find the pair with the lowest merge rank
-        best_pair = None
-        best_rank = float("inf")
-        best_idx = -1
-
-        for i in range(len(pieces) - 1):
-            pair = (pieces[i], pieces[i + 1])
-            rank = merge_ranks.get(pair)
-            if rank is not None and rank < best_rank:
-                best_rank = rank
-                best_pair = pair
-                best_idx = i
-
-        if best_pair is None:
-            break  # No more merges possible
-
-        # Apply the merge
-        merged = best_pair[0] + best_pair[1]
-        pieces = pieces[:best_idx] + [merged] + pieces[best_idx + 2 :]
-
-    return pieces
 
+    Same heap-over-linked-list structure as merge_tree._run_merges: the
+    next merge comes off a heap of (rank, left index) candidates instead
+    of rescanning all pieces per merge, which matters because this runs
+    once per vocabulary token. Stale entries are rejected by re-deriving
+    the popped pair's rank; ties go to the leftmost pair, as before.
+
+    merge_ranks is keyed by ``(left_id << 32) | right_id`` over the piece
+    ids in *piece_ids*, so every hot-loop lookup hashes one int instead of
+    allocating and hashing a tuple of two bytes objects. A piece absent
+    from the id table (id -1) cannot be the side of any merge, so its
+    pairs skip the lookup entirely.
+    """
+    n = len(token_bytes)
+    pieces = [token_bytes[i : i + 1] for i in range(n)]
+    if n < 2:
+        return pieces
+
+    ids_get = piece_ids.get
+    ids = [ids_get(p, -1) for p in pieces]
+    prev = list(range(-1, n - 1))
+    nxt = list(range(1, n + 1))
+    nxt[-1] = -1
+    alive = [True] * n
+
+    ranks_get = merge_ranks.get
+    heap: list[tuple[int, int]] = []
+    for i in range(n - 1):
+        if ids[i] >= 0 and ids[i + 1] >= 0:
+            rank = ranks_get((ids[i] << 32) | ids[i + 1])
+            if rank is not None:
+                heap.append((rank, i))
+    heapq.heapify(heap)
+
+    while heap:
+        rank, i = heapq.heappop(heap)
+        j = nxt[i] if alive[i] else -1
+        if j == -1:
+            continue
+        if ids[i] < 0 or ids[j] < 0 or ranks_get((ids[i] << 32) | ids[j]) != rank:
+            continue
 
-def detect_undertrained_tokens(adapter: TokenizerAdapter) -> list[dict]:
+        pieces[i] = pieces[i] + pieces[j]
+        ids[i] = ids_get(pieces[i], -1)
+        alive[j] = False
+        nxt[i] = nxt[j]
+        if nxt[j] != -1:
+            prev[nxt[j]] = i
+
+        if ids[i] >= 0:
+            p = prev[i]
+            if p != -1 and ids[p] >= 0:
+                new_rank = ranks_get((ids[p] << 32) | ids[i])
+                if new_rank is not None:
+                    heapq.heappush(heap, (new_rank, p))
+            q = nxt[i]
+            if q != -1 and ids[q] >= 0:
+                new_rank = ranks_get((ids[i] << 32) | ids[q])
+                if new_rank is not None:
+                    heapq.heappush(heap, (new_rank, i))
+
+    return [pieces[k] for k in range(n) if alive[k]]
+
+
+def _empty_table() -> UndertrainedTable:
+    return UndertrainedTable(
+        token_ids=np.empty(0, dtype=np.int32),
+        token_strs=[],
+        token_hexes=[],
+        reasons=[],
+        confidences=np.empty(0, dtype=np.float32),
+        merge_results=[],
+    )
+
+
+def detect_undertrained_tokens(adapter: TokenizerAdapter) -> UndertrainedTable:
     """
     Detect under-trained tokens using BPE merge reachability analysis.
 
@@ -67,64 +150,74 @@ def detect_undertrained_tokens(adapter: TokenizerAdapter) -> list[dict]:
     """
     merges_raw = adapter.get_merges()
     if merges_raw is None:
-        return []
+        return _empty_table()
 
-    vocab = adapter.get_vocab()
+    view = get_vocab_view(adapter)
 
-    # Build merge rank lookup (bytes-based)
-    merge_ranks: dict[tuple[bytes, bytes], int] = {}
-    merge_results: set[bytes] = set()
+    # Build merge rank lookup, interning each distinct piece to an int id
+    # and packing pairs into one uint64 key (see _simulate_bpe)
+    piece_ids: dict[bytes, int] = {}
+    merge_ranks: dict[int, int] = {}
+    merge_result_ids: set[int] = set()
 
     for rank, (left_str, right_str) in enumerate(merges_raw):
         left_bytes = left_str.encode("utf-8", errors="replace")
         right_bytes = right_str.encode("utf-8", errors="replace")
-        merge_ranks[(left_bytes, right_bytes)] = rank
-        merge_results.add(left_bytes + right_bytes)
-
-    # Track which tokens are base tokens (single bytes)
-    byte_ranks: dict[bytes, int] = {}
-    for token_str, token_id in vocab.items():
-        tb = token_str.encode("utf-8", errors="replace")
-        if len(tb) == 1:
-            byte_ranks[tb] = token_id
-
-    undertrained = []
-
-    for token_str, token_id in vocab.items():
-        token_bytes = token_str.encode("utf-8", errors="replace")
-
-        # Skip single-byte tokens (they're base vocabulary)
+        left_id = piece_ids.setdefault(left_bytes, len(piece_ids))
+        right_id = piece_ids.setdefault(right_bytes, len(piece_ids))
+        merged = left_bytes + right_bytes
+        merge_result_ids.add(piece_ids.setdefault(merged, len(piece_ids)))
+        merge_ranks[(left_id << 32) | right_id] = rank
+    merge_result_ids = frozenset(merge_result_ids)
+
+    # Materialize the candidate tokens once, skipping base vocabulary
+    # (single bytes) and special tokens (usually enclosed in <> or similar)
+    candidates: list[tuple[str, int, bytes]] = []
+    for token_str, token_id, token_bytes in zip(
+        view.token_strs, view.token_ids.tolist(), view.token_bytes
+    ):
         if len(token_bytes) <= 1:
             continue
-
-        # Skip special tokens (usually enclosed in <> or similar)
         if token_str.startswith("<") and token_str.endswith(">"):
             continue
+        candidates.append((token_str, token_id, token_bytes))
 
+    token_ids: list[int] = []
+    token_strs: list[str] = []
+    token_hexes: list[str] = []
+    all_reasons: list[str] = []
+    confidences: list[float] = []
+    results: list[list[str]] = []
+
+    for token_str, token_id, token_bytes in candidates:
         reasons = []
         confidence = 0.0
 
         # Check 1: Simulate BPE and see if this token is reachable
-        simulated = _simulate_bpe(token_bytes, merge_ranks, byte_ranks)
+        simulated = _simulate_bpe(token_bytes, merge_ranks, piece_ids)
         simulated_single = len(simulated) == 1 and simulated[0] == token_bytes
         if not simulated_single:
             reasons.append("unreachable via BPE merges")
             confidence = max(confidence, 0.8)
 
-        # Check 2: Is this token ever the result of a merge?
-        if token_bytes not in merge_results and len(token_bytes) > 1:
+        # Check 2: Is this token ever the result of a merge? Hashed over
+        # the interned int id; a token missing from the id table was never
+        # any merge's side or product
+        if piece_ids.get(token_bytes, -1) not in merge_result_ids:
             reasons.append("not a product of any merge rule")
             confidence = max(confidence, 0.6)
 
-        # Check 3: Unusual bytes
-        if _has_unusual_bytes(token_bytes):
-            reasons.append("contains unusual byte sequences")
-            confidence = max(confidence, 0.5)
-
-        # Check 4: Partial UTF-8
+        # Checks 3 and 4: one decode covers both the unusual-bytes check
+        # and the partial-UTF-8 check (previously each decoded separately)
         try:
             token_bytes.decode("utf-8")
+            valid_utf8 = True
         except UnicodeDecodeError:
+            valid_utf8 = False
+        if _has_unusual_bytes(token_bytes) or not valid_utf8:
+            reasons.append("contains unusual byte sequences")
+            confidence = max(confidence, 0.5)
+        if not valid_utf8:
             reasons.append("incomplete UTF-8 sequence")
             confidence = max(confidence, 0.7)
 
@@ -136,18 +229,21 @@ def detect_undertrained_tokens(adapter: TokenizerAdapter) -> list[dict]:
             s.decode("utf-8", errors="replace") for s in simulated
         ]
 
-        undertrained.append(
-            {
-                "token_id": token_id,
-                "token_str": token_str,
-                "token_bytes_hex": token_bytes.hex(),
-                "reason": "; ".join(reasons),
-                "confidence": round(confidence, 2),
-                "expected_merge_path": [token_str],
-                "actual_merge_result": expected_path,
-            }
-        )
+        token_ids.append(token_id)
+        token_strs.append(token_str)
+        token_hexes.append(token_bytes.hex())
+        all_reasons.append("; ".join(reasons))
+        confidences.append(confidence)
+        results.append(expected_path)
 
     # Sort by confidence (highest first)
-    undertrained.sort(key=lambda t: t["confidence"], reverse=True)
-    return undertrained
+    conf = np.array(confidences, dtype=np.float32)
+    order = np.argsort(-conf, kind="stable")
+    return UndertrainedTable(
+        token_ids=np.array(token_ids, dtype=np.int32)[order],
+        token_strs=[token_strs[i] for i in order],
+        token_hexes=[token_hexes[i] for i in order],
+        reasons=[all_reasons[i] for i in order],
+        confidences=conf[order],
+        merge_results=[results[i] for i in order],
+    )
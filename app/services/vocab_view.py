@@ -0,0 +1,53 @@
+"""Shared per-adapter vocabulary columns.
+
+The analysis services (morphemes, multiplicity, undertrained) each walk
+the full vocabulary and re-derive the same per-token basics: the UTF-8
+bytes and the space-marker-stripped form. This module computes those
+columns once per adapter and shares them, so back-to-back endpoint hits
+for the same tokenizer pay the scan a single time.
+"""
+
+from __future__ import annotations
+
+import weakref
+from dataclasses import dataclass
+
+import numpy as np
+
+from app.services.adapter import TokenizerAdapter
+from app.services.tokstr import strip_space_prefix
+
+
+@dataclass
+class VocabView:
+    """Parallel per-token columns over a tokenizer's vocabulary."""
+
+    token_strs: list[str]
+    token_ids: np.ndarray  # int32[N]
+    clean_strs: list[str]  # space markers stripped
+    token_bytes: list[bytes]  # UTF-8, errors="replace"
+
+    def __len__(self) -> int:
+        return len(self.token_strs)
+
+
+# adapter -> view; weak keys so the columns go away with the adapter when
+# the registry evicts it
+_view_cache: "weakref.WeakKeyDictionary[TokenizerAdapter, VocabView]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_vocab_view(adapter: TokenizerAdapter) -> VocabView:
+    """Get or build the cached vocabulary columns for an adapter."""
+    view = _view_cache.get(adapter)
+    if view is None:
+        vocab = adapter.get_vocab()
+        token_strs = list(vocab)
+        view = _view_cache[adapter] = VocabView(
+            token_strs=token_strs,
+            token_ids=np.fromiter(vocab.values(), dtype=np.int32, count=len(vocab)),
+            clean_strs=[strip_space_prefix(t) for t in token_strs],
+            token_bytes=[t.encode("utf-8", "replace") for t in token_strs],
+        )
+    return view